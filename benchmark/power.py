@@ -0,0 +1,102 @@
+"""
+`ReportService.get_all_power` over 1 year of 10-minute samples, reading the
+`whole` aggregate stored at ingest time, compared with summing the regions
+of every row on each request (the previous behavior).
+
+    poetry run python -m benchmark.power
+"""
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlmodel import Session, create_engine
+
+from crawler.model import (
+    Power,
+    PowerAreaReport,
+    PowerReport,
+    power_whole,
+    save_crawler_report,
+)
+from meter.domain import create_db_and_tables
+from meter.domain.report import ReportPage, ReportService
+
+N_SAMPLES = 365 * 24 * 6
+PAGE_SIZE = 1000
+
+
+def area():
+    load = random.uniform(30, 1500)
+    max_supply = random.uniform(load, load * 1.5)
+    return PowerAreaReport(
+        load=round(load, 2),
+        max_supply=round(max_supply, 2),
+        recv_rate=round((max_supply - load) / load * 100, 2),
+    )
+
+
+def report():
+    start = 1672502400  # 2023-01-01
+    for i in range(N_SAMPLES):
+        areas = {k: area() for k in ("east", "south", "central", "north")}
+        yield PowerReport(
+            timestamp=start + i * 600,
+            whole=power_whole(**areas),
+            **areas,
+        )
+
+
+def sum_regions(powers: list[Power]):
+    # what `get_all_power` did for every row before `whole` was stored
+    new_powers = []
+    for power in powers:
+        power = power.dict()
+        whole = {"load": 0, "max_supply": 0, "recv_rate": None}
+        for k in ("east", "central", "south", "north"):
+            whole["load"] += power[k]["load"]
+            if k != "east":
+                whole["max_supply"] += power[k]["max_supply"]
+        whole["recv_rate"] = (
+            ((whole["max_supply"] - whole["load"]) / whole["load"] * 100)
+            if whole["load"] != 0
+            else 1000
+        )
+        power["whole"] = whole
+        new_powers.append(Power(**power))
+    return new_powers
+
+
+def read_year(svc: ReportService, transform) -> float:
+    start = time.perf_counter()
+    page = ReportPage(limit=PAGE_SIZE)
+    n = 0
+    while True:
+        powers = transform(svc.get_all_power(page))
+        n += len(powers)
+        if len(powers) < PAGE_SIZE:
+            break
+        page.after = (powers[-1].timestamp, powers[-1].id)
+    assert n == N_SAMPLES
+    return time.perf_counter() - start
+
+
+def main():
+    random.seed(0)
+    engine = create_engine(f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench.db'}")
+    create_db_and_tables(engine)
+    save_crawler_report(engine, Power, report())
+
+    with Session(engine) as session:
+        svc = ReportService(session)
+        after = read_year(svc, lambda powers: powers)
+        session.expunge_all()
+        before = read_year(svc, sum_regions)
+
+    print(f"ReportService.get_all_power, {N_SAMPLES} rows in pages of {PAGE_SIZE}")
+    print(f"  whole summed per request: {before:6.2f} s")
+    print(f"  whole stored at ingest:   {after:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Requests/sec of `GET /rule/` with the cached config & engine,
+compared with building them on every request (the previous behavior).
+
+    poetry run python -m benchmark.rule
+"""
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Annotated
+
+import toml
+from fastapi import Depends
+from fastapi.testclient import TestClient
+
+from meter.api import get_async_engine, get_config, reload_config
+from meter.config import MeterConfig
+from meter.constant.rule_operator import RuleOperator
+from meter.constant.rule_position import RulePosition
+from meter.constant.rule_resource import RuleResource
+from meter.domain import get_async_engine as _get_async_engine
+from meter.domain.user import UserSignup
+from meter.main import create_app
+from tests.conftest import get_test_config
+from tests.helper import get_authorization_header
+
+N_REQUESTS = 500
+N_RULES = 20
+
+
+def get_config_per_request():
+    return MeterConfig()
+
+
+def get_engine_per_request(
+    cfg: Annotated[MeterConfig, Depends(get_config_per_request)]
+):
+    return _get_async_engine(cfg.sql)
+
+
+def run(client: TestClient, header: dict) -> float:
+    start = time.perf_counter()
+    for _ in range(N_REQUESTS):
+        resp = client.get("/rule/", headers=header)
+        assert resp.status_code == 200, resp.json()
+    return N_REQUESTS / (time.perf_counter() - start)
+
+
+def main():
+    tmp = Path(tempfile.mkdtemp())
+    cfg = get_test_config()
+    cfg.sql.url = f"sqlite:///{tmp / 'bench.db'}"
+    config_path = tmp / "meter.toml"
+    toml.dump(cfg.dict(), config_path.open("w"))
+    os.environ["METER_CONFIG"] = str(config_path)
+    asyncio.run(reload_config())
+
+    app = create_app()
+    with TestClient(app) as client:
+        header = get_authorization_header(
+            client,
+            UserSignup(name="bench", email="bench@bench.com", password="bench"),
+        )
+        for i in range(N_RULES):
+            client.post(
+                "/rule/",
+                json={
+                    "name": f"rule{i}",
+                    "position": RulePosition.SHIMEN_RESERVOIR,
+                    "resource": RuleResource.PERCENT,
+                    "operator": RuleOperator.LESS_THAN,
+                    "value": i,
+                },
+                headers=header,
+            )
+
+        app.dependency_overrides[get_config] = get_config_per_request
+        app.dependency_overrides[get_async_engine] = get_engine_per_request
+        before = run(client, header)
+
+        app.dependency_overrides.clear()
+        after = run(client, header)
+
+    print(f"GET /rule/ x {N_REQUESTS}")
+    print(f"  config & engine per request: {before:8.1f} req/s")
+    print(f"  cached config & engine:      {after:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Crawl the history of a report over a date range, saving each response as
+it arrives so that memory stays flat however long the range is.
+
+    python -m crawler.backfill eq 1995-01-01 2023-05-31
+    python -m crawler.backfill dam 2022-01-01 2022-12-31 --concurrency 2 --rate 1
+"""
+import argparse
+import logging
+from datetime import date
+
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel, create_engine
+
+from .crawler import dam, eq
+from .crawler.crawler import CrawlLimits
+from .model import Dam, Eq, SaveResult
+from .model.migration import migrate
+from .pipeline import run_pipeline
+
+BACKFILLS = {
+    "eq": (eq.EqCrawler, eq.queries, Eq),
+    "dam": (dam.DamCrawler, dam.queries, Dam),
+}
+
+
+def backfill_range(
+    engine: Engine,
+    name: str,
+    since: date,
+    until: date,
+    limits: CrawlLimits = CrawlLimits(),
+    update: bool = False,
+) -> SaveResult:
+    crawler, queries, model = BACKFILLS[name]
+    return run_pipeline(engine, crawler(queries(since, until), limits), model, update)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Crawl the history of a report over a date range."
+    )
+    parser.add_argument("report", choices=BACKFILLS.keys())
+    parser.add_argument("since", type=date.fromisoformat)
+    parser.add_argument("until", type=date.fromisoformat)
+    parser.add_argument("--db", default="sqlite:///database.db")
+    parser.add_argument("--update", action="store_true")
+    for k, field in CrawlLimits.__fields__.items():
+        parser.add_argument(f"--{k}", type=field.type_, default=field.default)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    engine = create_engine(args.db)
+    SQLModel.metadata.create_all(engine)
+    migrate(engine)
+
+    limits = CrawlLimits(**{k: getattr(args, k) for k in CrawlLimits.__fields__})
+    result = backfill_range(
+        engine, args.report, args.since, args.until, limits, args.update
+    )
+    print(result)
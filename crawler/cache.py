@@ -0,0 +1,59 @@
+import time
+from typing import Any, Protocol
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from .model import CrawlerCache
+
+
+class Cache(Protocol):
+    def get(self, key: str) -> Any | None:
+        """The value of `key`, or `None` if it is missing or expired."""
+        ...
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+
+class MemoryCache:
+    """A cache of the current process only."""
+
+    def __init__(self):
+        self.values: dict[str, tuple[Any, float]] = {}
+
+    def get(self, key: str) -> Any | None:
+        value, expires = self.values.get(key, (None, 0))
+        if expires <= time.time():
+            return None
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.values[key] = (value, time.time() + ttl)
+
+
+class SQLCache:
+    """A cache kept in the `CrawlerCache` table, shared by every worker."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def get(self, key: str) -> Any | None:
+        with Session(self.engine) as session:
+            item = session.get(CrawlerCache, key)
+            if item is None or item.expires <= time.time():
+                return None
+            return item.value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with Session(self.engine) as session:
+            session.merge(CrawlerCache(key=key, value=value, expires=time.time() + ttl))
+            try:
+                session.commit()
+            except IntegrityError:
+                # another worker has just set it
+                session.rollback()
+
+
+# shared by the crawlers in this process, unless they are given another cache
+MEMORY_CACHE = MemoryCache()
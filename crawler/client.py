@@ -0,0 +1,102 @@
+"""
+A process-wide `httpx.AsyncClient`, so that crawls keep their connections
+(and TLS sessions) alive instead of handshaking again on every task.
+
+A client is bound to the event loop it is used on, so `run` keeps one loop
+alive in a background thread for the whole process, and every crawl run
+through it shares the same client.
+"""
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Coroutine, TypeVar
+
+import httpx
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class HTTPConfig(BaseModel):
+    # needs the `h2` package, i.e. `httpx[http2]`
+    http2: bool = False
+    # seconds, the default of each request
+    timeout: float = 30
+    connect_timeout: float = 10
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    # seconds an idle connection is kept
+    keepalive_expiry: float = 60
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.http2,
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+        )
+
+
+_config = HTTPConfig()
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_pid: int | None = None
+_lock = threading.Lock()
+
+
+def configure(config: HTTPConfig) -> None:
+    """Use `config` for the clients created from now on."""
+    global _config
+    close()
+    _config = config
+
+
+def get_client() -> httpx.AsyncClient:
+    """The shared client of the running event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = _config.client()
+        _client_loop = loop
+    return _client
+
+
+@asynccontextmanager
+async def shared_client() -> AsyncIterator[httpx.AsyncClient]:
+    """`get_client`, as a context manager which leaves it open."""
+    yield get_client()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_pid
+    with _lock:
+        # threads do not survive `fork()`, start another one in the child
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(
+                target=_loop.run_forever, name="crawler-client", daemon=True
+            ).start()
+        return _loop
+
+
+def run(coro: Coroutine[None, None, T]) -> T:
+    """Run `coro` on the process-wide event loop, where the shared client lives."""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+
+
+def close() -> None:
+    """Close the shared client, e.g. when the worker process shuts down."""
+    global _client, _client_loop
+    client, loop = _client, _client_loop
+    _client = _client_loop = None
+    if client is None or client.is_closed:
+        return
+    if loop is _loop and _loop_pid == os.getpid():
+        run(client.aclose())
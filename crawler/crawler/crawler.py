@@ -1,26 +1,103 @@
 import abc
 import asyncio
-from typing import Generic, Iterable, Iterator, Optional, TypeVar
+import hashlib
+import logging
+from collections import defaultdict, deque
+from itertools import islice
+from typing import (
+    AsyncContextManager,
+    AsyncIterator,
+    Generic,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    TypedDict,
+    TypeVar,
+)
 
 import httpx
-from httpx import Response
 from httpx._types import HeaderTypes, RequestContent, URLTypes
+from pydantic import BaseModel
+
+from ..cache import Cache
+from ..client import shared_client
 
 Report = TypeVar("Report")
 Query = TypeVar("Query")
 
 
+class CrawlLimits(BaseModel):
+    # requests in flight at once
+    concurrency: int = 4
+    # requests started per second, for each host
+    rate: float = 2
+    retries: int = 3
+    # seconds before the first retry, doubled on each one
+    backoff: float = 1
+    timeout: float = 30
+
+
+class RateLimiter:
+    """Space out the requests to each host by `1 / rate` seconds."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.next: dict[str, float] = defaultdict(float)
+
+    async def wait(self, host: str):
+        now = asyncio.get_running_loop().time()
+        start = max(now, self.next[host])
+        self.next[host] = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+def retryable(e: httpx.HTTPError) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return isinstance(e, httpx.TransportError)
+
+
+class Validators(TypedDict):
+    """What a response is compared with on the next fetch of its query."""
+
+    etag: Optional[str]
+    last_modified: Optional[str]
+    # sha256 of the body
+    hash: str
+
+
+class Fetched(NamedTuple):
+    key: Optional[str]
+    validators: Optional[Validators]
+    # `None` if unchanged since the last fetch
+    content: Optional[bytes]
+
+
 class Crawler(Generic[Report, Query], metaclass=abc.ABCMeta):
     METHOD: str
     HEADERS: Optional[HeaderTypes]
+    # seconds to keep the validators of a response
+    VALIDATORS_TTL: float = 86400
 
     def __init_subclass__(cls, method: str, headers: Optional[HeaderTypes] = None):
         cls.METHOD = method
         cls.HEADERS = headers
 
-    def __init__(self, queries: Iterable[Query] = [...]):
+    def __init__(
+        self,
+        queries: Iterable[Query] = [...],
+        limits: CrawlLimits = CrawlLimits(),
+        cache: Optional[Cache] = None,
+    ):
+        """
+        With a `cache`, queries are fetched conditionally, and the responses
+        which have not changed since the last crawl are neither parsed nor saved.
+        """
         self.queries = queries
-        self.done: list[bytes] = []
+        self.limits = limits
+        self.cache = cache
 
     @abc.abstractmethod
     def _url(self, query: Query) -> URLTypes:
@@ -44,15 +121,153 @@ class Crawler(Generic[Report, Query], metaclass=abc.ABCMeta):
         for query in self.queries:
             yield self._data(query)
 
-    def report(self) -> Iterator[Report]:
-        for data in self.done:
-            yield from self._report(data)
-
-    async def crawl(self):
-        async with httpx.AsyncClient() as client:
-            reqs = (
-                client.request(self.METHOD, url, content=data, headers=self.HEADERS)
-                for url, data in zip(self.urls, self.data)
-            )
-            resps: list[Response] = await asyncio.gather(*reqs)
-            self.done.extend(map(lambda r: r.content, resps))
+    def _client(self) -> AsyncContextManager[httpx.AsyncClient]:
+        return shared_client()
+
+    async def _request_data(
+        self,
+        client: httpx.AsyncClient,
+        query: Query,
+    ) -> RequestContent:
+        """Request body of `query`, for crawlers which need to fetch more than `_data`."""
+        return self._data(query)
+
+    async def _prepare(self):
+        """Fetch what `_report` needs, while the first requests are in flight."""
+        pass
+
+    def _more(self, query: Query, data: bytes) -> Iterable[Query]:
+        """Queries following a changed response of `query`, e.g. its next pages."""
+        return ()
+
+    def _on_error(self, query: Query, e: httpx.HTTPError):
+        """Called when a request of `query` fails, before it is retried."""
+        pass
+
+    def _digest(self, data: bytes) -> str:
+        """Hash of the part of a response body which `_report` reads."""
+        return hashlib.sha256(data).hexdigest()
+
+    def _cache_key(self, query: Query) -> str:
+        data = self._data(query)
+        if not isinstance(data, bytes):
+            data = str(data).encode()
+        digest = hashlib.sha256(data).hexdigest()
+        return f"crawl:{self.METHOD} {self._url(query)} {digest}"
+
+    async def _validators(self, query: Query):
+        if self.cache is None:
+            return None, None
+        key = self._cache_key(query)
+        return key, await asyncio.to_thread(self.cache.get, key)
+
+    async def _fetch(
+        self,
+        client: httpx.AsyncClient,
+        limiter: RateLimiter,
+        query: Query,
+    ) -> Fetched:
+        url = httpx.URL(self._url(query))
+        key, cached = await self._validators(query)
+        headers = httpx.Headers(self.HEADERS)
+        if cached is not None:
+            if cached["etag"] is not None:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"] is not None:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        for retry in range(self.limits.retries + 1):
+            await limiter.wait(url.host)
+            try:
+                data = await self._request_data(client, query)
+                resp = await client.request(
+                    self.METHOD,
+                    url,
+                    content=data,
+                    headers=headers,
+                    timeout=self.limits.timeout,
+                )
+                if resp.status_code == httpx.codes.NOT_MODIFIED and cached is not None:
+                    return Fetched(key, cached, None)
+                resp.raise_for_status()
+                break
+            except httpx.HTTPError as e:
+                self._on_error(query, e)
+                if retry == self.limits.retries or not retryable(e):
+                    raise e
+                logging.warning(f"[crawl] retry: query = {query}, exception = {e!r}")
+                await asyncio.sleep(self.limits.backoff * 2**retry)
+
+        validators = Validators(
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+            hash=self._digest(resp.content),
+        )
+        if cached is not None and cached["hash"] == validators["hash"]:
+            return Fetched(key, validators, None)
+        return Fetched(key, validators, resp.content)
+
+    async def _responses(self) -> AsyncIterator[Fetched]:
+        """
+        Fetch the queries with at most `limits.concurrency` requests in flight,
+        yielding each response as soon as it arrives. Failed queries are logged
+        and skipped. The queries from `_more` are fetched before the next ones.
+        """
+        limiter = RateLimiter(self.limits.rate)
+        queries = iter(self.queries)
+        more: deque[Query] = deque()
+        pending: dict[asyncio.Task, Query] = {}
+        async with self._client() as client:
+            try:
+                while True:
+                    n = self.limits.concurrency - len(pending)
+                    taken = [more.popleft() for _ in range(min(n, len(more)))]
+                    for query in taken + list(islice(queries, n - len(taken))):
+                        task = asyncio.create_task(self._fetch(client, limiter, query))
+                        pending[task] = query
+                    if len(pending) == 0:
+                        break
+
+                    done, _ = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        query = pending.pop(task)
+                        try:
+                            fetched = task.result()
+                        except httpx.HTTPError as e:
+                            logging.error(
+                                f"[crawl] failed: query = {query}, exception = {e!r}!"
+                            )
+                            continue
+                        if fetched.content is not None:
+                            more.extend(self._more(query, fetched.content))
+                        yield fetched
+            finally:
+                for task in pending:
+                    task.cancel()
+
+    async def stream(self, batch_size: int = 500) -> AsyncIterator[list[Report]]:
+        """
+        Parse each response as soon as it arrives, yielding its reports in
+        batches of at most `batch_size`. Nothing is kept after a batch is taken.
+        Unchanged responses are skipped.
+        """
+        prepare = asyncio.create_task(self._prepare())
+        try:
+            async for fetched in self._responses():
+                if fetched.content is not None:
+                    await prepare
+                    reports = self._report(fetched.content)
+                    while batch := list(islice(reports, batch_size)):
+                        yield batch
+                # remembered only after its reports are saved
+                if fetched.key is not None:
+                    await asyncio.to_thread(
+                        self.cache.set,
+                        fetched.key,
+                        fetched.validators,
+                        self.VALIDATORS_TTL,
+                    )
+        finally:
+            prepare.cancel()
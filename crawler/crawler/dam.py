@@ -1,6 +1,8 @@
+import asyncio
+import hashlib
 import time
-from datetime import datetime
-from typing import TypedDict
+from datetime import date, datetime, timedelta
+from typing import Iterator, TypedDict
 from urllib.parse import urlencode
 
 import httpx
@@ -8,6 +10,8 @@ import httpx
 from ..model import DamReport
 from .crawler import Crawler
 
+ROW = b'<a href="ReservoirChart.aspx?key='
+
 
 class DamQuery(TypedDict):
     year: int
@@ -15,6 +19,13 @@ class DamQuery(TypedDict):
     day: int
 
 
+def queries(since: date, until: date) -> Iterator[DamQuery]:
+    """Every day from `since` to `until`, inclusive."""
+    for n in range((until - since).days + 1):
+        day = since + timedelta(days=n)
+        yield DamQuery(year=day.year, month=day.month, day=day.day)
+
+
 def getval(data: str, name: str):
     delim = f'id="{name}" value="'
     val = data[data.find(delim) + len(delim) :]
@@ -22,19 +33,43 @@ def getval(data: str, name: str):
     return val
 
 
-def payload():
-    r = httpx.get("https://fhy.wra.gov.tw/ReservoirPage_2011/Statistics.aspx")
-    data = r.text
+def payload(page: str):
     return urlencode(
         {
             "__EVENTTARGET": "ctl00$cphMain$btnQuery",
-            "__EVENTVALIDATION": getval(data, "__EVENTVALIDATION"),
-            "__VIEWSTATE": getval(data, "__VIEWSTATE"),
-            "__VIEWSTATEGENERATOR": getval(data, "__VIEWSTATEGENERATOR"),
+            "__EVENTVALIDATION": getval(page, "__EVENTVALIDATION"),
+            "__VIEWSTATE": getval(page, "__VIEWSTATE"),
+            "__VIEWSTATEGENERATOR": getval(page, "__VIEWSTATEGENERATOR"),
         }
     )
 
 
+class FormTokens:
+    """
+    ASP.NET form tokens of a page, fetched once and shared by every query
+    until `ttl` seconds pass or the server rejects them.
+    """
+
+    def __init__(self, url: str, ttl: float = 600):
+        self.url = url
+        self.ttl = ttl
+        self.payload: str | None = None
+        self.expires = 0.0
+        self.lock = asyncio.Lock()
+
+    async def get(self, client: httpx.AsyncClient) -> str:
+        async with self.lock:
+            if self.payload is None or time.monotonic() >= self.expires:
+                r = await client.get(self.url)
+                r.raise_for_status()
+                self.payload = payload(r.text)
+                self.expires = time.monotonic() + self.ttl
+            return self.payload
+
+    def invalidate(self):
+        self.payload = None
+
+
 HEADERS = {"content-type": "application/x-www-form-urlencoded"}
 
 
@@ -69,8 +104,12 @@ class DamCrawler(Crawler[DamReport, DamQuery], method="post", headers=HEADERS):
     def _url(self, query: DamQuery):
         return self.URL
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tokens = FormTokens(self.URL)
+
     def _data(self, query: DamQuery):
-        return payload() + urlencode(
+        return urlencode(
             {
                 "ctl00$cphMain$ucDate$cboYear": query["year"],
                 "ctl00$cphMain$ucDate$cboMonth": query["month"],
@@ -78,8 +117,20 @@ class DamCrawler(Crawler[DamReport, DamQuery], method="post", headers=HEADERS):
             }
         )
 
+    async def _request_data(self, client: httpx.AsyncClient, query: DamQuery):
+        return f"{await self.tokens.get(client)}&{self._data(query)}"
+
+    def _on_error(self, query: DamQuery, e: httpx.HTTPError):
+        # expired or rejected tokens fail the postback, fetch them again
+        self.tokens.invalidate()
+
+    def _digest(self, data: bytes) -> str:
+        # the form tokens around the table differ on every response
+        table = data.partition(ROW)[2].partition(b"</table>")[0]
+        return hashlib.sha256(table).hexdigest()
+
     def _report(self, data: bytes):
-        dams = data.decode().split('<a href="ReservoirChart.aspx?key=')[1:]
+        dams = data.decode().split(ROW.decode())[1:]
         for dam in dams:
             dam = dam.split("</td><td")
             yield DamReport(
@@ -1,18 +1,34 @@
 import json
-import math
+import logging
 import time
-from datetime import datetime
-from typing import TypedDict
+from datetime import date, datetime
+from typing import Iterator, TypedDict
 
-from ..model import EqReport, Geometry, Intensity, Point
+import numpy as np
+
+from ..intensity import intensity_matrix
+from ..model import EqReport, Geometry, Point
 from .crawler import Crawler
 
 
-class EqQuery(TypedDict):
+class _EqPage(TypedDict, total=False):
+    # offset of the first row, the first page if missing
+    start: int
+
+
+class EqQuery(_EqPage):
     year: int
     month: int
 
 
+def queries(since: date, until: date) -> Iterator[EqQuery]:
+    """Every month from `since` to `until`, inclusive."""
+    year, month = since.year, since.month
+    while (year, month) <= (until.year, until.month):
+        yield EqQuery(year=year, month=month)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
 def geojson(point: Point):
     return Geometry(type="Point", coordinates=point)
 
@@ -21,95 +37,52 @@ def timestamp(timestr: str):
     return int(time.mktime(datetime.strptime(timestr, "%Y-%m-%d %H:%M:%S").timetuple()))
 
 
-def rad2deg(rad: float):
-    deg = rad * 180 / math.pi
-    return deg
-
-
-def deg2rad(deg: float):
-    rad = deg * math.pi / 180
-    return rad
-
-
-def geodist(p1: Point, p2: Point):
-    theta = p1[0] - p2[0]
-    dist = (
-        60
-        * 1.1515
-        * rad2deg(
-            math.acos(
-                (math.sin(deg2rad(p1[1])) * math.sin(deg2rad(p2[1])))
-                + (
-                    math.cos(deg2rad(p1[1]))
-                    * math.cos(deg2rad(p2[1]))
-                    * math.cos(deg2rad(theta))
-                )
-            )
-        )
-    )
-    return dist * 1.609344
-
-
-def intensity(scale: float, depth: float, center: Point) -> Intensity:
-    params = [
-        (121.010, 24.7730, 1.758),
-        (120.618, 24.2115, 1.063),
-        (120.272, 23.1135, 1.968),
-    ]
-    intens: list[int] = []
-    for p in params:
-        dist = geodist(center, (p[0], p[1]))
-        r = math.sqrt(dist**2 + depth**2)
-        pga = 1.657 * (math.e ** (1.533 * scale)) * (r**-1.607) * p[2]
-        if pga < 80:
-            if pga < 0.8:
-                inten = 0
-            elif pga < 2.5:
-                inten = 1
-            elif pga < 8.0:
-                inten = 2
-            elif pga < 25:
-                inten = 3
-            else:
-                inten = 4
-        else:
-            pgv = pga / 8.6561
-            if pgv < 15:
-                inten = 4
-            if pgv < 50:
-                inten = 5
-            if pgv < 140:
-                inten = 6
-            else:
-                inten = 7
-        intens.append(inten)
-    return tuple(intens)
-
-
 HEADERS = {"content-type": "application/x-www-form-urlencoded"}
 
 
 class EqCrawler(Crawler[EqReport, EqQuery], method="post", headers=HEADERS):
     URL = "https://scweb.cwb.gov.tw/zh-tw/earthquake/ajaxhandler"
-    PAYLOAD = "draw=3&columns%5B0%5D%5Bdata%5D=0&columns%5B0%5D%5Bname%5D=EventNo&columns%5B0%5D%5Bsearchable%5D=false&columns%5B0%5D%5Borderable%5D=true&columns%5B0%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B0%5D%5Bsearch%5D%5Bregex%5D=false&columns%5B1%5D%5Bdata%5D=1&columns%5B1%5D%5Bname%5D=MaxIntensity&columns%5B1%5D%5Bsearchable%5D=true&columns%5B1%5D%5Borderable%5D=true&columns%5B1%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B1%5D%5Bsearch%5D%5Bregex%5D=false&columns%5B2%5D%5Bdata%5D=2&columns%5B2%5D%5Bname%5D=OriginTime&columns%5B2%5D%5Bsearchable%5D=true&columns%5B2%5D%5Borderable%5D=true&columns%5B2%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B2%5D%5Bsearch%5D%5Bregex%5D=false&columns%5B3%5D%5Bdata%5D=3&columns%5B3%5D%5Bname%5D=MagnitudeValue&columns%5B3%5D%5Bsearchable%5D=true&columns%5B3%5D%5Borderable%5D=true&columns%5B3%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B3%5D%5Bsearch%5D%5Bregex%5D=false&columns%5B4%5D%5Bdata%5D=4&columns%5B4%5D%5Bname%5D=Depth&columns%5B4%5D%5Bsearchable%5D=true&columns%5B4%5D%5Borderable%5D=true&columns%5B4%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B4%5D%5Bsearch%5D%5Bregex%5D=false&columns%5B5%5D%5Bdata%5D=5&columns%5B5%5D%5Bname%5D=Description&columns%5B5%5D%5Bsearchable%5D=true&columns%5B5%5D%5Borderable%5D=true&columns%5B5%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B5%5D%5Bsearch%5D%5Bregex%5D=false&columns%5B6%5D%5Bdata%5D=6&columns%5B6%5D%5Bname%5D=Description&columns%5B6%5D%5Bsearchable%5D=true&columns%5B6%5D%5Borderable%5D=true&columns%5B6%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B6%5D%5Bsearch%5D%5Bregex%5D=false&order%5B0%5D%5Bcolumn%5D=2&order%5B0%5D%5Bdir%5D=desc&start=0&length=50&search%5Bvalue%5D=&search%5Bregex%5D=false&Search={year}%E5%B9%B4{month}%E6%9C%88&txtSDate=&txtEDate=&txtSscale=&txtEscale=&txtSdepth=&txtEdepth=&txtLonS=&txtLonE=&txtLatS=&txtLatE=&ddlCity=&ddlTown=&ddlCitySta=&ddlStation=&txtIntensityB=&txtIntensityE=&txtLon=&txtLat=&txtKM=&ddlStationName=------&cblEventNo=&txtSDatePWS=&txtEDatePWS=&txtSscalePWS=&txtEscalePWS=&ddlMark="
+    PAYLOAD = "draw=3&columns%5B0%5D%5Bdata%5D=0&columns%5B0%5D%5Bname%5D=EventNo&columns%5B0%5D%5Bsearchable%5D=false&columns%5B0%5D%5Borderable%5D=true&columns%5B0%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B0%5D%5Bsearch%5D%5Bregex%5D=false&columns%5B1%5D%5Bdata%5D=1&columns%5B1%5D%5Bname%5D=MaxIntensity&columns%5B1%5D%5Bsearchable%5D=true&columns%5B1%5D%5Borderable%5D=true&columns%5B1%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B1%5D%5Bsearch%5D%5Bregex%5D=false&columns%5B2%5D%5Bdata%5D=2&columns%5B2%5D%5Bname%5D=OriginTime&columns%5B2%5D%5Bsearchable%5D=true&columns%5B2%5D%5Borderable%5D=true&columns%5B2%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B2%5D%5Bsearch%5D%5Bregex%5D=false&columns%5B3%5D%5Bdata%5D=3&columns%5B3%5D%5Bname%5D=MagnitudeValue&columns%5B3%5D%5Bsearchable%5D=true&columns%5B3%5D%5Borderable%5D=true&columns%5B3%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B3%5D%5Bsearch%5D%5Bregex%5D=false&columns%5B4%5D%5Bdata%5D=4&columns%5B4%5D%5Bname%5D=Depth&columns%5B4%5D%5Bsearchable%5D=true&columns%5B4%5D%5Borderable%5D=true&columns%5B4%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B4%5D%5Bsearch%5D%5Bregex%5D=false&columns%5B5%5D%5Bdata%5D=5&columns%5B5%5D%5Bname%5D=Description&columns%5B5%5D%5Bsearchable%5D=true&columns%5B5%5D%5Borderable%5D=true&columns%5B5%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B5%5D%5Bsearch%5D%5Bregex%5D=false&columns%5B6%5D%5Bdata%5D=6&columns%5B6%5D%5Bname%5D=Description&columns%5B6%5D%5Bsearchable%5D=true&columns%5B6%5D%5Borderable%5D=true&columns%5B6%5D%5Bsearch%5D%5Bvalue%5D=&columns%5B6%5D%5Bsearch%5D%5Bregex%5D=false&order%5B0%5D%5Bcolumn%5D=2&order%5B0%5D%5Bdir%5D=desc&start={start}&length={length}&search%5Bvalue%5D=&search%5Bregex%5D=false&Search={year}%E5%B9%B4{month}%E6%9C%88&txtSDate=&txtEDate=&txtSscale=&txtEscale=&txtSdepth=&txtEdepth=&txtLonS=&txtLonE=&txtLatS=&txtLatE=&ddlCity=&ddlTown=&ddlCitySta=&ddlStation=&txtIntensityB=&txtIntensityE=&txtLon=&txtLat=&txtKM=&ddlStationName=------&cblEventNo=&txtSDatePWS=&txtEDatePWS=&txtSscalePWS=&txtEscalePWS=&ddlMark="
+
+    # rows requested per page
+    PAGE_SIZE = 50
 
     def _url(self, query: EqQuery):
         return self.URL
 
     def _data(self, query: EqQuery):
-        return self.PAYLOAD.format(**query).encode()
+        page = {"start": 0} | query | {"length": self.PAGE_SIZE}
+        return self.PAYLOAD.format(**page).encode()
+
+    def _more(self, query: EqQuery, data: bytes):
+        # the first page tells how many earthquakes the month has
+        if query.get("start", 0) != 0:
+            return
+        body = json.loads(data.decode())
+        total = body.get("recordsFiltered", body.get("recordsTotal"))
+        if total is None:
+            if len(body["data"]) >= self.PAGE_SIZE:
+                logging.warning(f"[crawl] eq: query = {query} may have more pages")
+            return
+        for start in range(self.PAGE_SIZE, total, self.PAGE_SIZE):
+            yield query | {"start": start}
 
     def _report(self, data: bytes):
         eq: list[list[str]] = json.loads(data.decode())["data"]
-        for d in eq:
-            scale = float(d[3])
-            depth = float(d[4])
-            loc = (float(d[7]), float(d[8]))
+        if len(eq) == 0:
+            return
+
+        scale, depth, lon, lat = np.array(
+            [(d[3], d[4], d[7], d[8]) for d in eq], dtype=float
+        ).T
+        intensities = intensity_matrix(scale, depth, lon, lat)
+        for d, s, lo, la, inten in zip(eq, scale, lon, lat, intensities):
             yield EqReport(
                 timestamp=timestamp(d[2]),
-                geometry=geojson(loc),
-                scale=scale,
-                intensity=intensity(scale, depth, loc),
+                geometry=geojson((float(lo), float(la))),
+                scale=float(s),
+                depth=float(d[4]),
+                intensity=tuple(int(i) for i in inten),
                 link=f"https://scweb.cwb.gov.tw/zh-tw/earthquake/imgs/{d[0]}",
                 img=f"https://scweb.cwb.gov.tw/webdata/OLDEQ/{d[0][:6]}/{d[0]}_H.png",
             )
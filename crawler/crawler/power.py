@@ -1,17 +1,21 @@
+import asyncio
 import time
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable, Optional
 
 import httpx
 
-from ..model import PowerAreaReport, PowerReport
-from .crawler import Crawler
+from ..cache import MEMORY_CACHE, Cache
+from ..model import PowerAreaReport, PowerReport, power_whole
+from .crawler import Crawler, CrawlLimits
 
+SUPPLY_URL = "https://www.taipower.com.tw/d006/loadGraph/loadGraph/data/loadpara.json"
+SUPPLY_KEY = "power.supply"
 
-def mxpowersply():
-    r = httpx.get(
-        "https://www.taipower.com.tw/d006/loadGraph/loadGraph/data/loadpara.json"
-    )
+
+async def mxpowersply(client: httpx.AsyncClient) -> list[float]:
+    r = await client.get(SUPPLY_URL)
+    r.raise_for_status()
     data = r.json()
     mxsply = float(data["records"][1]["fore_maxi_sply_capacity"])
 
@@ -36,6 +40,17 @@ IDontCare = Any
 class PowerCrawler(Crawler[PowerReport, IDontCare], method="get"):
     URL = "https://www.taipower.com.tw/d006/loadGraph/loadGraph/data/loadareas.csv"
 
+    def __init__(
+        self,
+        queries: Iterable[Any] = [...],
+        limits: CrawlLimits = CrawlLimits(),
+        cache: Optional[Cache] = MEMORY_CACHE,
+        # the forecast max supply changes at most daily
+        supply_ttl: float = 3600,
+    ):
+        super().__init__(queries, limits, cache)
+        self.supply_ttl = supply_ttl
+
     def _url(self, query: Any):
         return self.URL
 
@@ -49,30 +64,45 @@ class PowerCrawler(Crawler[PowerReport, IDontCare], method="get"):
             d = line.split(",")
             load = list(map(float, d[1:]))
             recv = list(map(lambda s, l: (s - l) / l * 100, self.supply, load))
+            east = PowerAreaReport(
+                load=load[0],
+                max_supply=round(self.supply[0], 2),
+                recv_rate=round(recv[0], 2),
+            )
+            south = PowerAreaReport(
+                load=load[1],
+                max_supply=round(self.supply[1], 2),
+                recv_rate=round(recv[1], 2),
+            )
+            central = PowerAreaReport(
+                load=load[2],
+                max_supply=round(self.supply[2], 2),
+                recv_rate=round(recv[2], 2),
+            )
+            north = PowerAreaReport(
+                load=load[3],
+                max_supply=round(self.supply[3], 2),
+                recv_rate=round(recv[3], 2),
+            )
             yield PowerReport(
                 timestamp=timestamp(d[0]),
-                east=PowerAreaReport(
-                    load=load[0],
-                    max_supply=round(self.supply[0], 2),
-                    recv_rate=round(recv[0], 2),
-                ),
-                south=PowerAreaReport(
-                    load=load[1],
-                    max_supply=round(self.supply[1], 2),
-                    recv_rate=round(recv[1], 2),
-                ),
-                central=PowerAreaReport(
-                    load=load[2],
-                    max_supply=round(self.supply[2], 2),
-                    recv_rate=round(recv[2], 2),
-                ),
-                north=PowerAreaReport(
-                    load=load[3],
-                    max_supply=round(self.supply[3], 2),
-                    recv_rate=round(recv[3], 2),
-                ),
+                east=east,
+                south=south,
+                central=central,
+                north=north,
+                whole=power_whole(east, south, central, north),
             )
 
-    async def crawl(self):
-        self.supply = mxpowersply()
-        return await super().crawl()
+    async def _prepare(self):
+        # without a cache, the supply is fetched on every crawl
+        supply = None
+        if self.cache is not None:
+            supply = await asyncio.to_thread(self.cache.get, SUPPLY_KEY)
+        if supply is None:
+            async with self._client() as client:
+                supply = await mxpowersply(client)
+            if self.cache is not None:
+                await asyncio.to_thread(
+                    self.cache.set, SUPPLY_KEY, supply, self.supply_ttl
+                )
+        self.supply = supply
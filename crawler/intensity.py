@@ -0,0 +1,135 @@
+"""
+Seismic intensity estimated from the scale, depth and epicentre of an
+earthquake, by PGA attenuation at a site.
+"""
+import math
+
+import numpy as np
+import numpy.typing as npt
+
+Point = tuple[float, float]
+Intensity = tuple[int, int, int]
+# (lon, lat, site factor)
+Site = tuple[float, float, float]
+
+
+def rad2deg(rad: float):
+    deg = rad * 180 / math.pi
+    return deg
+
+
+def deg2rad(deg: float):
+    rad = deg * math.pi / 180
+    return rad
+
+
+def geodist(p1: Point, p2: Point):
+    theta = p1[0] - p2[0]
+    dist = (
+        60
+        * 1.1515
+        * rad2deg(
+            math.acos(
+                (math.sin(deg2rad(p1[1])) * math.sin(deg2rad(p2[1])))
+                + (
+                    math.cos(deg2rad(p1[1]))
+                    * math.cos(deg2rad(p2[1]))
+                    * math.cos(deg2rad(theta))
+                )
+            )
+        )
+    )
+    return dist * 1.609344
+
+
+# (lon, lat, site factor) of the sites in `EqReport.intensity`, which are
+# also registered as `EqSite` by default
+SITES: dict[str, Site] = {
+    "HSINCHU": (121.010, 24.7730, 1.758),
+    "TAICHUNG": (120.618, 24.2115, 1.063),
+    "TAINAN": (120.272, 23.1135, 1.968),
+}
+
+# upper bounds of intensity 0 ~ 3 by PGA, intensity 4 up to `PGA_PGV`
+PGA_INTENSITY = [0.8, 2.5, 8.0, 25]
+PGA_PGV = 80
+
+
+def intensity(scale: float, depth: float, center: Point) -> Intensity:
+    intens: list[int] = []
+    for p in SITES.values():
+        dist = geodist(center, (p[0], p[1]))
+        r = math.sqrt(dist**2 + depth**2)
+        pga = 1.657 * (math.e ** (1.533 * scale)) * (r**-1.607) * p[2]
+        if pga < 80:
+            if pga < 0.8:
+                inten = 0
+            elif pga < 2.5:
+                inten = 1
+            elif pga < 8.0:
+                inten = 2
+            elif pga < 25:
+                inten = 3
+            else:
+                inten = 4
+        else:
+            pgv = pga / 8.6561
+            if pgv < 15:
+                inten = 4
+            if pgv < 50:
+                inten = 5
+            if pgv < 140:
+                inten = 6
+            else:
+                inten = 7
+        intens.append(inten)
+    return tuple(intens)
+
+
+def geodist_matrix(
+    lon: npt.ArrayLike,
+    lat: npt.ArrayLike,
+    site_lon: npt.ArrayLike,
+    site_lat: npt.ArrayLike,
+) -> np.ndarray:
+    """`geodist` between every point and every site, shaped (points, sites)."""
+    lon = np.asarray(lon, dtype=float)[:, np.newaxis]
+    lat = np.asarray(lat, dtype=float)[:, np.newaxis]
+    site_lon = np.asarray(site_lon, dtype=float)[np.newaxis, :]
+    site_lat = np.asarray(site_lat, dtype=float)[np.newaxis, :]
+
+    theta = lon - site_lon
+    cos = (np.sin(lat * np.pi / 180) * np.sin(site_lat * np.pi / 180)) + (
+        np.cos(lat * np.pi / 180)
+        * np.cos(site_lat * np.pi / 180)
+        * np.cos(theta * np.pi / 180)
+    )
+    # rounding may push a point on the site slightly out of [-1, 1]
+    dist = 60 * 1.1515 * (np.arccos(np.clip(cos, -1, 1)) * 180 / np.pi)
+    return dist * 1.609344
+
+
+def intensity_matrix(
+    scale: npt.ArrayLike,
+    depth: npt.ArrayLike,
+    lon: npt.ArrayLike,
+    lat: npt.ArrayLike,
+    sites: npt.ArrayLike = list(SITES.values()),
+) -> np.ndarray:
+    """
+    `intensity` of many earthquakes at many sites in one pass. `sites` are
+    rows of (lon, lat, site factor), and the result is shaped (earthquakes, sites).
+    """
+    sites = np.asarray(sites, dtype=float).reshape(-1, 3)
+    scale = np.asarray(scale, dtype=float)[:, np.newaxis]
+    depth = np.asarray(depth, dtype=float)[:, np.newaxis]
+
+    dist = geodist_matrix(lon, lat, sites[:, 0], sites[:, 1])
+    r = np.sqrt(dist**2 + depth**2)
+    pga = 1.657 * (np.e ** (1.533 * scale)) * (r**-1.607) * sites[np.newaxis, :, 2]
+
+    inten = np.searchsorted(PGA_INTENSITY, pga, side="right")
+    # same as `intensity`, every PGV under 140 ends up as 6
+    pgv = pga / 8.6561
+    inten = np.where(pga < PGA_PGV, inten, np.where(pgv < 140, 6, 7))
+    return inten.astype(int)
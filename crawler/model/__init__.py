@@ -1,10 +1,20 @@
-from typing import Literal, Optional, TypedDict
+from typing import Any, Iterable, Literal, Optional, TypedDict
 
-from sqlalchemy import JSON
-from sqlmodel import Column, Field, Session, SQLModel, UniqueConstraint
+from sqlalchemy import JSON, Column, insert, tuple_
+from sqlalchemy import update as sa_update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import (
+    Field,
+    Index,
+    Session,
+    SQLModel,
+    UniqueConstraint,
+    and_,
+    func,
+    select,
+)
 
-# TODO: Maybe we could store `Eq.geometry`, `Eq.intensity`, and the columns
-#       under `Power` in alternative data types instead of `JSON`.
+from ..intensity import SITES, Intensity, Point, intensity_matrix
 
 
 class DamReport(SQLModel):
@@ -19,8 +29,57 @@ class Dam(DamReport, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
 
 
-Point = tuple[float, float]
-Intensity = tuple[int, int, int]
+# main reservoirs of each region, summed up by `DamRegion`
+DAM_REGIONS = {
+    "竹": ("石門水庫", "寶山第二水庫", "永和山水庫"),
+    "中": ("鯉魚潭水庫", "德基水庫"),
+    "南": ("南化水庫", "曾文水庫", "烏山頭水庫"),
+}
+
+
+class DamRegion(SQLModel, table=True):
+    """Latest storage of a region in `DAM_REGIONS`, refreshed when `Dam` is saved."""
+
+    name: str = Field(primary_key=True)
+    timestamp: int
+    storage: float
+    percent: float
+
+
+def update_dam_regions(session: Session):
+    names = [name for dams in DAM_REGIONS.values() for name in dams]
+    latest = (
+        select(Dam.name, func.max(Dam.timestamp).label("timestamp"))
+        .where(Dam.name.in_(names))
+        .group_by(Dam.name)
+        .subquery()
+    )
+    statement = select(Dam).join(
+        latest,
+        and_(Dam.name == latest.c.name, Dam.timestamp == latest.c.timestamp),
+    )
+    dams = {dam.name: dam for dam in session.exec(statement)}
+
+    for region, members in DAM_REGIONS.items():
+        timestamp = 0
+        storage = 0
+        all_storage = 0
+        for name in members:
+            dam = dams.get(name)
+            if dam is None:
+                continue
+            timestamp = max(timestamp, dam.timestamp)
+            storage += dam.storage
+            if dam.percent != 0:
+                all_storage += dam.storage / dam.percent
+        session.merge(
+            DamRegion(
+                name=region,
+                timestamp=timestamp,
+                storage=storage,
+                percent=0 if all_storage == 0 else storage / all_storage,
+            )
+        )
 
 
 class Geometry(TypedDict):
@@ -29,17 +88,177 @@ class Geometry(TypedDict):
 
 
 class EqReport(SQLModel):
-    timestamp: int = Field(index=True)
-    geometry: Geometry = Field(sa_column=Column(JSON), nullable=False)
+    timestamp: int
+    geometry: Geometry
     scale: float
-    intensity: Intensity = Field(sa_column=Column(JSON), nullable=False)
+    depth: Optional[float] = None
+    # intensity at the default sites (Hsinchu, Taichung, Tainan)
+    intensity: Intensity
     link: str
     img: str
 
 
-class Eq(EqReport, table=True):
+class ReadEq(EqReport):
+    id: int
+    # intensity at every registered `EqSite`
+    site_intensity: dict[str, int] = {}
+
+
+class Eq(SQLModel, table=True):
+    """An `EqReport` with the epicentre in its own columns."""
+
     __table_args__ = (UniqueConstraint("timestamp"),)
     id: Optional[int] = Field(default=None, primary_key=True)
+    timestamp: int = Field(index=True)
+    lon: float
+    lat: float
+    # unknown for earthquakes saved before it was stored
+    depth: Optional[float] = None
+    scale: float
+    link: str
+    img: str
+
+    @classmethod
+    def from_report(cls, report: EqReport) -> "Eq":
+        lon, lat = report.geometry["coordinates"]
+        return cls(
+            timestamp=report.timestamp,
+            lon=lon,
+            lat=lat,
+            depth=report.depth,
+            scale=report.scale,
+            link=report.link,
+            img=report.img,
+        )
+
+    def to_report(self, intensities: dict[str, int]) -> ReadEq:
+        return ReadEq(
+            id=self.id,
+            timestamp=self.timestamp,
+            geometry=Geometry(type="Point", coordinates=(self.lon, self.lat)),
+            scale=self.scale,
+            depth=self.depth,
+            intensity=tuple(intensities.get(name, 0) for name in SITES),
+            site_intensity=intensities,
+            link=self.link,
+            img=self.img,
+        )
+
+
+class EqSite(SQLModel, table=True):
+    """A site where the intensity of every earthquake is estimated."""
+
+    name: str = Field(primary_key=True)
+    lon: float
+    lat: float
+    # amplification of PGA at the site
+    factor: float
+
+
+class EqIntensity(SQLModel, table=True):
+    __table_args__ = (
+        Index(
+            "ix_eqintensity_site_intensity_timestamp", "site", "intensity", "timestamp"
+        ),
+    )
+    eq_id: int = Field(foreign_key="eq.id", primary_key=True)
+    site: str = Field(foreign_key="eqsite.name", primary_key=True)
+    # `Eq.timestamp`, copied for the index
+    timestamp: int
+    intensity: int
+
+
+# earthquakes read at once when estimating intensities of a site
+INTENSITY_BATCH_SIZE = 1000
+
+
+def _estimate_intensities(eqs: list[Eq], sites: list[EqSite]) -> list[dict]:
+    if len(eqs) == 0 or len(sites) == 0:
+        return []
+
+    matrix = intensity_matrix(
+        [e.scale for e in eqs],
+        [e.depth for e in eqs],
+        [e.lon for e in eqs],
+        [e.lat for e in eqs],
+        [(s.lon, s.lat, s.factor) for s in sites],
+    )
+    return [
+        dict(
+            eq_id=eq.id,
+            site=site.name,
+            timestamp=eq.timestamp,
+            intensity=int(matrix[i, j]),
+        )
+        for i, eq in enumerate(eqs)
+        for j, site in enumerate(sites)
+    ]
+
+
+def _save_intensities(session: Session, rows: list[dict], update: bool):
+    for i in range(0, len(rows), SAVE_CHUNK_SIZE):
+        chunk = rows[i : i + SAVE_CHUNK_SIZE]
+        stmt = _upsert_statement(
+            session.get_bind(), EqIntensity, chunk, ["eq_id", "site"], update
+        )
+        if stmt is not None:
+            session.execute(stmt)
+            continue
+
+        # fallback for other dialects
+        for row in chunk:
+            session.merge(EqIntensity(**row))
+
+
+def update_eq_intensities(
+    session: Session,
+    reports: Iterable[EqReport],
+    update: bool = False,
+):
+    """Estimate intensities of saved earthquakes at every registered site."""
+    reports = {r.timestamp: r for r in reports}
+    sites = session.exec(select(EqSite)).all()
+    names = {site.name for site in sites}
+
+    timestamps = list(reports.keys())
+    for i in range(0, len(timestamps), SAVE_CHUNK_SIZE):
+        statement = select(Eq).where(
+            Eq.timestamp.in_(timestamps[i : i + SAVE_CHUNK_SIZE])
+        )
+        eqs = session.exec(statement).all()
+        rows = _estimate_intensities([e for e in eqs if e.depth is not None], sites)
+
+        # without depth, only the default sites estimated by the crawler are known
+        for eq in eqs:
+            if eq.depth is not None:
+                continue
+            rows.extend(
+                dict(eq_id=eq.id, site=name, timestamp=eq.timestamp, intensity=value)
+                for name, value in zip(SITES, reports[eq.timestamp].intensity)
+                if name in names
+            )
+        _save_intensities(session, rows, update)
+
+
+def update_site_intensities(session: Session, site: EqSite):
+    """
+    (Re)estimate the intensity at `site` of every earthquake with depth,
+    committing each batch so that the history is not held in one transaction.
+    """
+    last = 0
+    while True:
+        statement = (
+            select(Eq)
+            .where(Eq.depth != None, Eq.id > last)
+            .order_by(Eq.id)
+            .limit(INTENSITY_BATCH_SIZE)
+        )
+        eqs = session.exec(statement).all()
+        if len(eqs) == 0:
+            break
+        _save_intensities(session, _estimate_intensities(eqs, [site]), update=True)
+        session.commit()
+        last = eqs[-1].id
 
 
 class PowerAreaReport(TypedDict):
@@ -49,30 +268,181 @@ class PowerAreaReport(TypedDict):
 
 
 class PowerReport(SQLModel):
-    timestamp: int = Field(index=True)
-    east: PowerAreaReport = Field(sa_column=Column(JSON), nullable=False)
-    south: PowerAreaReport = Field(sa_column=Column(JSON), nullable=False)
-    central: PowerAreaReport = Field(sa_column=Column(JSON), nullable=False)
-    north: PowerAreaReport = Field(sa_column=Column(JSON), nullable=False)
+    timestamp: int
+    east: PowerAreaReport
+    south: PowerAreaReport
+    central: PowerAreaReport
+    north: PowerAreaReport
+    # aggregate of the whole grid, see `power_whole`
+    whole: PowerAreaReport
 
 
-class Power(PowerReport, table=True):
-    __table_args__ = (UniqueConstraint("timestamp"),)
+# regions of `PowerReport`, stored as one `PowerArea` row each
+POWER_REGIONS = ("east", "south", "central", "north", "whole")
+
+
+class Power(PowerReport):
+    """A `PowerReport` assembled from `PowerArea` rows of the same timestamp."""
+
+    # `id` of the "whole" row, used for pagination
+    id: Optional[int] = None
+
+
+class PowerArea(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint("timestamp", "region"),
+        Index("ix_powerarea_region_timestamp", "region", "timestamp"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
+    timestamp: int = Field(index=True)
+    region: str
+    load: float
+    max_supply: float
+    recv_rate: float
+
+    @classmethod
+    def from_report(cls, report: PowerReport) -> list["PowerArea"]:
+        return [
+            cls(timestamp=report.timestamp, region=region, **getattr(report, region))
+            for region in POWER_REGIONS
+        ]
+
+    @staticmethod
+    def to_report(areas: list["PowerArea"]) -> Power:
+        """Assemble all regions of a timestamp back into a report."""
+        regions = {
+            a.region: PowerAreaReport(
+                load=a.load,
+                max_supply=a.max_supply,
+                recv_rate=a.recv_rate,
+            )
+            for a in areas
+        }
+        whole = next(a for a in areas if a.region == "whole")
+        return Power(id=whole.id, timestamp=whole.timestamp, **regions)
+
 
+def power_whole(
+    east: PowerAreaReport,
+    south: PowerAreaReport,
+    central: PowerAreaReport,
+    north: PowerAreaReport,
+) -> PowerAreaReport:
+    load = east["load"] + central["load"] + south["load"] + north["load"]
+    max_supply = central["max_supply"] + south["max_supply"] + north["max_supply"]
+    return PowerAreaReport(
+        load=round(load, 2),
+        max_supply=round(max_supply, 2),
+        recv_rate=round((max_supply - load) / load * 100, 2) if load != 0 else 1000,
+    )
 
-class PowerReturn(Power):
-    whole: PowerAreaReport = Field(sa_column=Column(JSON), nullable=False)
 
+class CrawlerCache(SQLModel, table=True):
+    """A value shared by the crawlers of every worker, see `crawler.cache`."""
+
+    key: str = Field(primary_key=True)
+    value: Any = Field(sa_column=Column(JSON, nullable=False))
+    # unix time after which the value is stale
+    expires: float
+
+
+class SaveResult(TypedDict):
+    inserted: int
+    updated: int
+    skipped: int
+
+
+# keep the number of bound parameters under SQLite's default limit (999)
+SAVE_CHUNK_SIZE = 100
+
+
+def _upsert_statement(engine, model, rows: list[dict], keys: list[str], update: bool):
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model).values(rows)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model).values(rows)
+    else:
+        return None
+
+    if not update:
+        return stmt.on_conflict_do_nothing(index_elements=keys)
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={k: stmt.excluded[k] for k in rows[0].keys() if k not in keys},
+    )
+
+
+def save_crawler_report(engine, model, report, update: bool = False) -> SaveResult:
+    """
+    Save a crawler report in a few statements, using `INSERT ... ON CONFLICT`
+    keyed on the unique constraint of `model`. Existing rows are skipped,
+    or overwritten if `update` is set.
+
+    `Power` reports are saved as `PowerArea` rows, and counted by those rows.
+    `Eq` is saved from `EqReport`, along with its `EqIntensity` at every site.
+    """
+    if model is Power:
+        model = PowerArea
+        report = [area for r in report for area in PowerArea.from_report(r)]
+    elif model is Eq:
+        eq_reports = list(report)
+        report = [Eq.from_report(r) for r in eq_reports]
+
+    (constraint,) = (
+        c for c in model.__table__.constraints if isinstance(c, UniqueConstraint)
+    )
+    keys = [c.name for c in constraint.columns]
+    key_columns = [getattr(model, k) for k in keys]
+
+    # deduplicate the report itself, the latest one wins
+    result = SaveResult(inserted=0, updated=0, skipped=0)
+    rows = {}
+    for r in report:
+        row = r.dict(exclude={"id"})
+        key = tuple(row[k] for k in keys)
+        if key in rows:
+            result["skipped"] += 1
+        rows[key] = row
 
-def save_crawler_report(engine, model, report):
     with Session(engine) as session:
-        for r in report:
-            session.add(model(**r.dict()))
-            # TODO: Upsert the report.
-            #       It appears that sqlmodel does not support either the
-            #       `UPSERT` or `INSERT OR IGNORE` operations.
-            try:
-                session.commit()
-            except:
-                session.rollback()
+        items = list(rows.items())
+        for i in range(0, len(items), SAVE_CHUNK_SIZE):
+            chunk = dict(items[i : i + SAVE_CHUNK_SIZE])
+            existing = set(
+                tuple(e)
+                for e in session.execute(
+                    select(*key_columns).where(tuple_(*key_columns).in_(chunk.keys()))
+                )
+            )
+            new = [row for key, row in chunk.items() if key not in existing]
+            old = [row for key, row in chunk.items() if key in existing]
+            result["inserted"] += len(new)
+            if update:
+                result["updated"] += len(old)
+            else:
+                result["skipped"] += len(old)
+
+            stmt = _upsert_statement(engine, model, list(chunk.values()), keys, update)
+            if stmt is not None:
+                session.execute(stmt)
+                continue
+
+            # fallback for other dialects
+            if len(new) != 0:
+                session.execute(insert(model).values(new))
+            if update:
+                for row in old:
+                    session.execute(
+                        sa_update(model)
+                        .where(*(getattr(model, k) == row[k] for k in keys))
+                        .values(row)
+                    )
+
+        if model is Dam:
+            update_dam_regions(session)
+        elif model is Eq:
+            update_eq_intensities(session, eq_reports, update)
+        session.commit()
+
+    return result
@@ -0,0 +1,167 @@
+"""
+Schema changes of the crawler tables which `SQLModel.metadata.create_all`
+can not apply to an existing database, and the rows they need. Each
+migration checks the current state first, so `migrate` is safe to run on
+every startup.
+"""
+import json
+
+from sqlalchemy import MetaData, Table, insert, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from ..intensity import SITES
+from . import (
+    POWER_REGIONS,
+    Dam,
+    DamRegion,
+    Eq,
+    EqIntensity,
+    EqSite,
+    PowerArea,
+    power_whole,
+    update_dam_regions,
+)
+
+# rows inserted in one `executemany` when copying data
+BATCH_SIZE = 1000
+
+
+def _columns(engine: Engine, table: str) -> set[str]:
+    inspector = inspect(engine)
+    if not inspector.has_table(table):
+        return set()
+    return {c["name"] for c in inspector.get_columns(table)}
+
+
+def _json(value):
+    # JSON columns come back as text on a reflected table
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def split_power_regions(engine: Engine):
+    """
+    Move the legacy `power` table, one JSON column per region, into one
+    `PowerArea` row per region. `whole` is computed for the tables created
+    before it was stored.
+    """
+    columns = _columns(engine, "power")
+    if len(columns) == 0:
+        return
+
+    PowerArea.__table__.create(engine, checkfirst=True)
+    legacy = Table("power", MetaData(), autoload_with=engine)
+    with engine.begin() as conn:
+        areas = []
+        for row in conn.execute(select(legacy)).mappings():
+            regions = {k: _json(row[k]) for k in ("east", "south", "central", "north")}
+            whole = _json(row["whole"]) if "whole" in columns else None
+            regions["whole"] = whole or power_whole(**regions)
+            areas.extend(
+                dict(timestamp=row["timestamp"], region=region, **regions[region])
+                for region in POWER_REGIONS
+            )
+            if len(areas) >= BATCH_SIZE:
+                conn.execute(insert(PowerArea.__table__), areas)
+                areas = []
+        if len(areas) > 0:
+            conn.execute(insert(PowerArea.__table__), areas)
+        legacy.drop(conn)
+
+
+def seed_eq_sites(engine: Engine):
+    """Register the default sites of `EqReport.intensity` if missing."""
+    with Session(engine) as session:
+        for name, (lon, lat, factor) in SITES.items():
+            if session.get(EqSite, name) is None:
+                session.add(EqSite(name=name, lon=lon, lat=lat, factor=factor))
+        session.commit()
+
+
+def rebuild_eq_table(engine: Engine):
+    """
+    Rebuild an `eq` table without `depth`, which kept the epicentre and
+    intensities in JSON or in `intensity_*` columns. Row ids are kept and the
+    intensities are moved into `EqIntensity` of the default sites.
+    """
+    columns = _columns(engine, Eq.__tablename__)
+    if len(columns) == 0 or "depth" in columns:
+        return
+
+    legacy = Table(Eq.__tablename__, MetaData(), autoload_with=engine)
+    with engine.begin() as conn:
+        rows = conn.execute(select(legacy)).mappings().all()
+        # `EqIntensity` refers to the legacy table
+        EqIntensity.__table__.drop(conn, checkfirst=True)
+        legacy.drop(conn)
+        Eq.__table__.create(conn)
+        EqIntensity.__table__.create(conn)
+
+        for i in range(0, len(rows), BATCH_SIZE):
+            eqs = []
+            intensities = []
+            for row in rows[i : i + BATCH_SIZE]:
+                if "geometry" in columns:
+                    lon, lat = _json(row["geometry"])["coordinates"]
+                    intensity = _json(row["intensity"])
+                else:
+                    lon, lat = row["lon"], row["lat"]
+                    intensity = [row[f"intensity_{name.lower()}"] for name in SITES]
+                eqs.append(
+                    dict(
+                        id=row["id"],
+                        timestamp=row["timestamp"],
+                        lon=lon,
+                        lat=lat,
+                        depth=None,
+                        scale=row["scale"],
+                        link=row["link"],
+                        img=row["img"],
+                    )
+                )
+                intensities.extend(
+                    dict(
+                        eq_id=row["id"],
+                        site=name,
+                        timestamp=row["timestamp"],
+                        intensity=value,
+                    )
+                    for name, value in zip(SITES, intensity)
+                )
+            conn.execute(insert(Eq.__table__), eqs)
+            conn.execute(insert(EqIntensity.__table__), intensities)
+
+        # the ids were inserted explicitly, so the sequence has not moved on
+        if conn.dialect.name == "postgresql":
+            conn.execute(
+                text(
+                    "SELECT setval(pg_get_serial_sequence(:table, 'id'),"
+                    f" (SELECT coalesce(max(id), 0) + 1 FROM {Eq.__tablename__}),"
+                    " false)"
+                ),
+                {"table": Eq.__tablename__},
+            )
+
+
+def seed_dam_regions(engine: Engine):
+    """Fill `DamRegion` from the `Dam` rows saved before it existed."""
+    with Session(engine) as session:
+        if session.exec(select(DamRegion).limit(1)).first() is not None:
+            return
+        if session.exec(select(Dam).limit(1)).first() is None:
+            return
+        update_dam_regions(session)
+        session.commit()
+
+
+MIGRATIONS = [
+    split_power_regions,
+    seed_eq_sites,
+    rebuild_eq_table,
+    seed_dam_regions,
+]
+
+
+def migrate(engine: Engine):
+    for migration in MIGRATIONS:
+        migration(engine)
@@ -0,0 +1,46 @@
+"""
+crawl → parse → batch → save, chained as async generators. `Crawler.stream`
+parses each response as it arrives and cuts it into bounded batches, which
+are saved one by one while the next responses are still being fetched.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator
+
+from sqlalchemy.engine import Engine
+
+from . import client
+from .crawler.crawler import Crawler
+from .model import SaveResult, save_crawler_report
+
+# reports handed to `save_crawler_report` at once
+BATCH_SIZE = 500
+
+
+async def save_stream(
+    engine: Engine,
+    model,
+    batches: AsyncIterator[list],
+    update: bool = False,
+) -> SaveResult:
+    total = SaveResult(inserted=0, updated=0, skipped=0)
+    async for batch in batches:
+        # save in a thread so that the event loop keeps fetching
+        result = await asyncio.to_thread(
+            save_crawler_report, engine, model, batch, update
+        )
+        for k in total:
+            total[k] += result[k]
+        logging.info(f"[pipeline] {model.__name__}: {result}")
+    return total
+
+
+def run_pipeline(
+    engine: Engine,
+    crawler: Crawler,
+    model,
+    update: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> SaveResult:
+    # on the process-wide loop, to reuse the connections of the shared client
+    return client.run(save_stream(engine, model, crawler.stream(batch_size), update))
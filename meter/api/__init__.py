@@ -1,31 +1,69 @@
+from functools import lru_cache
 from typing import Annotated
 
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from meter.config import MeterConfig
+from meter.domain import get_async_engine as _get_async_engine
 from meter.domain import get_engine as _get_engine
 from meter.domain.auth import AuthService
-from meter.domain.issue import IssueService
-from meter.domain.report import ReportService
-from meter.domain.rule import RuleService
+from meter.domain.issue import AsyncIssueService, IssueService
+from meter.domain.report import AsyncReportService
+from meter.domain.rule import AsyncRuleService
+from meter.domain.site import AsyncSiteService
 from meter.domain.smtp import EmailService
-from meter.domain.user import UserService
-from meter.helper import raise_unauthorized_exception
+from meter.domain.user import USER_CACHE, AsyncUserService, PasswordHasher, User
+from meter.helper import raise_forbidden_exception, raise_unauthorized_exception
 from meter.job.trigger_rule import TriggerRuleJob
 
 oauth2_schema = OAuth2PasswordBearer(tokenUrl="/auth/token", scheme_name="JWT")
 
 
+# engines (and their connection pools) keyed by the SQL config they are built from
+_engines: dict[str, Engine] = {}
+_async_engines: dict[str, AsyncEngine] = {}
+# password hashers (and their thread pools) keyed by the cost and pool size
+_hashers: dict[tuple[int, int], PasswordHasher] = {}
+
+
+@lru_cache
 def get_config():
     return MeterConfig()
 
 
 def get_engine(cfg: Annotated[MeterConfig, Depends(get_config)]):
-    return _get_engine(cfg.sql)
+    key = cfg.sql.json()
+    if key not in _engines:
+        _engines[key] = _get_engine(cfg.sql)
+    return _engines[key]
+
+
+def get_async_engine(cfg: Annotated[MeterConfig, Depends(get_config)]):
+    key = cfg.sql.json()
+    if key not in _async_engines:
+        _async_engines[key] = _get_async_engine(cfg.sql)
+    return _async_engines[key]
+
+
+async def reload_config():
+    """
+    Re-read the config file on next use and dispose the cached engines,
+    they will be rebuilt from the new config.
+    """
+    get_config.cache_clear()
+    for engine in _engines.values():
+        engine.dispose()
+    _engines.clear()
+    async_engines = list(_async_engines.values())
+    _async_engines.clear()
+    for async_engine in async_engines:
+        await async_engine.dispose()
 
 
 def get_session(engine: Annotated[Engine, Depends(get_engine)]):
@@ -33,8 +71,25 @@ def get_session(engine: Annotated[Engine, Depends(get_engine)]):
         yield session
 
 
-def get_user_service(session: Annotated[Session, Depends(get_session)]):
-    return UserService(session)
+async def get_async_session(engine: Annotated[AsyncEngine, Depends(get_async_engine)]):
+    # keep the loaded objects usable after commit, they can not be lazily
+    # refreshed outside of the session
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+
+
+def get_password_hasher(cfg: Annotated[MeterConfig, Depends(get_config)]):
+    key = (cfg.auth.bcrypt_rounds, cfg.auth.password_workers)
+    if key not in _hashers:
+        _hashers[key] = PasswordHasher(*key)
+    return _hashers[key]
+
+
+def get_user_service(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    hasher: Annotated[PasswordHasher, Depends(get_password_hasher)],
+):
+    return AsyncUserService(session, hasher)
 
 
 def get_auth_service(cfg: Annotated[MeterConfig, Depends(get_config)]):
@@ -45,31 +100,38 @@ def get_email_service(cfg: Annotated[MeterConfig, Depends(get_config)]):
     return EmailService(cfg.smtp)
 
 
-def get_rule_service(session: Annotated[Session, Depends(get_session)]):
-    return RuleService(session)
+def get_rule_service(session: Annotated[AsyncSession, Depends(get_async_session)]):
+    return AsyncRuleService(session)
 
 
-def get_issue_service(session: Annotated[Session, Depends(get_session)]):
-    return IssueService(session)
+def get_issue_service(session: Annotated[AsyncSession, Depends(get_async_session)]):
+    return AsyncIssueService(session)
 
 
-def get_report_service(session: Annotated[Session, Depends(get_session)]):
-    return ReportService(session)
+def get_report_service(session: Annotated[AsyncSession, Depends(get_async_session)]):
+    return AsyncReportService(session)
+
+
+def get_site_service(session: Annotated[AsyncSession, Depends(get_async_session)]):
+    return AsyncSiteService(session)
 
 
 def get_trigger_rule_job(
     session: Annotated[Session, Depends(get_session)],
     email_svc: Annotated[EmailService, Depends(get_email_service)],
-    issue_svc: Annotated[IssueService, Depends(get_issue_service)],
 ):
-    return TriggerRuleJob(session, email_svc, issue_svc)
+    return TriggerRuleJob(session, email_svc, IssueService(session))
 
 
-def get_current_user(
+async def get_current_user(
     token: Annotated[str, Depends(oauth2_schema)],
-    user_svc: Annotated[UserService, Depends(get_user_service)],
+    user_svc: Annotated[AsyncUserService, Depends(get_user_service)],
     auth_svc: Annotated[AuthService, Depends(get_auth_service)],
 ):
+    cached = USER_CACHE.get(token)
+    if cached is not None:
+        return cached.user
+
     try:
         payload = auth_svc.decode_jwt(token)
         username: str = payload.get("sub")
@@ -77,7 +139,17 @@ def get_current_user(
             raise_unauthorized_exception()
     except JWTError:
         raise_unauthorized_exception()
-    user = user_svc._get_by_name(username)
+    user = await user_svc._get_by_name(username)
     if user is None:
         raise_unauthorized_exception()
+    USER_CACHE.set(token, payload, user, auth_svc.config.user_cache_ttl_sec)
+    return user
+
+
+async def get_admin_user(
+    user: Annotated[User, Depends(get_current_user)],
+    cfg: Annotated[MeterConfig, Depends(get_config)],
+):
+    if user.name not in cfg.auth.admins:
+        raise_forbidden_exception()
     return user
@@ -1,4 +1,5 @@
 from datetime import timedelta
+from queue import Full
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -17,7 +18,7 @@ from meter.api import (
 from meter.constant.response_code import ResponseCode
 from meter.domain.auth import AuthService
 from meter.domain.smtp import EmailService
-from meter.domain.user import User, UserLogin, UserService
+from meter.domain.user import AsyncUserService, User, UserLogin
 from meter.helper import (
     get_formatted_string_from_template,
     raise_custom_exception,
@@ -35,10 +36,10 @@ class Token(BaseModel):
 @router.post("/token")
 async def new_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    user_svc: Annotated[UserService, Depends(get_user_service)],
+    user_svc: Annotated[AsyncUserService, Depends(get_user_service)],
     auth_svc: Annotated[AuthService, Depends(get_auth_service)],
 ):
-    user = user_svc.login(
+    user = await user_svc.login(
         UserLogin(
             name=form_data.username,
             password=form_data.password,
@@ -76,18 +77,26 @@ async def send_email(
         verify_email.template_path,
         callback_url=callback_url,
     )
-    email_svc.send_noreply(
-        [user.email],
-        verify_email.subject,
-        content,
-    )
+    try:
+        # a full queue fails the request instead of blocking the event loop
+        email_svc.send_noreply(
+            [user.email],
+            verify_email.subject,
+            content,
+            block=False,
+        )
+    except Full:
+        raise_custom_exception(
+            ResponseCode.AUTH_SEND_EMAIL_FAILED_1202,
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
     return access_token
 
 
 @router.get("/active", status_code=status.HTTP_204_NO_CONTENT)
 async def active(
     token: str,
-    user_svc: Annotated[UserService, Depends(get_user_service)],
+    user_svc: Annotated[AsyncUserService, Depends(get_user_service)],
     auth_svc: Annotated[AuthService, Depends(get_auth_service)],
 ):
     """Activate a user."""
@@ -98,9 +107,9 @@ async def active(
             raise_unauthorized_exception()
     except JWTError:
         raise_unauthorized_exception()
-    user = user_svc._get_by_name(username)
+    user = await user_svc._get_by_name(username)
     if user.active:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "User Has Been Actived")
     if user is None:
         raise_unauthorized_exception()
-    user_svc.activate(user)
+    await user_svc.activate(user)
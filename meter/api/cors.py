@@ -25,5 +25,7 @@ def set_cors(app: FastAPI, config: CORSConfig | None):
         ],
         allow_credentials=True,
         allow_headers=["Content-Type", "Authorization"],
+        # cursor of the next page of `/report/*`
+        expose_headers=["X-Next-Cursor"],
         **cors_args,
     )
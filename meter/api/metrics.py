@@ -1,13 +1,18 @@
 from fastapi import APIRouter
+from pydantic import BaseModel
+
+from meter.domain.smtp import SMTPPoolMetrics, pool_metrics
 
 router = APIRouter()
 
 
-@router.get("/")
-async def get_metrics():
-    pass
+class Metrics(BaseModel):
+    smtp: list[SMTPPoolMetrics]
 
 
-@router.post("/")
-async def write_metrics():
-    pass
+@router.get(
+    "/",
+    response_model=Metrics,
+)
+async def get_metrics():
+    return Metrics(smtp=pool_metrics())
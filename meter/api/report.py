@@ -1,32 +1,115 @@
-from typing import Annotated
+import csv
+import io
+import json
+from typing import Annotated, Any, AsyncIterator, Mapping
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 
-from crawler.model import Dam, Eq, PowerReturn
+from crawler.model import Dam, Eq, Power, PowerArea, ReadEq
 from meter.api import get_report_service
-from meter.domain.report import ReportService
+from meter.constant.export_format import ExportFormat
+from meter.domain.report import AsyncReportService, ReportPage
 
 router = APIRouter()
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def get_report_page(
+    since: int | None = None,
+    until: int | None = None,
+    after: Annotated[
+        str | None,
+        Query(description=f"The `{NEXT_CURSOR_HEADER}` of the previous page"),
+    ] = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+):
+    try:
+        cursor = None if after is None else ReportPage.parse_cursor(after)
+    except ValueError:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, "Invalid cursor")
+    return ReportPage(since=since, until=until, after=cursor, limit=limit)
+
+
+def set_next_cursor(response: Response, page: ReportPage, items: list):
+    # items without `id` are summaries, not rows of the table
+    rows = [i for i in items if i.id is not None]
+    if len(rows) == page.limit:
+        response.headers[NEXT_CURSOR_HEADER] = ReportPage.cursor_of(rows[-1])
+
+
+async def to_ndjson(rows: AsyncIterator[Mapping[str, Any]]):
+    async for row in rows:
+        yield json.dumps(dict(row), ensure_ascii=False) + "\n"
+
+
+async def to_csv(rows: AsyncIterator[Mapping[str, Any]]):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    header = None
+    async for row in rows:
+        if header is None:
+            header = list(row.keys())
+            writer.writerow(header)
+        # nested values, if any, are kept as JSON in a cell
+        writer.writerow(
+            json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else v
+            for v in row.values()
+        )
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+def export_response(
+    svc: AsyncReportService,
+    model,
+    format: ExportFormat,
+    since: int | None,
+    until: int | None,
+):
+    rows = svc.export(model, since, until)
+    encode = to_ndjson if format == ExportFormat.NDJSON else to_csv
+    filename = f"{model.__tablename__}.{format.value}"
+    return StreamingResponse(
+        encode(rows),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 
 @router.get(
     "/power",
-    response_model=list[PowerReturn],
+    response_model=list[Power],
 )
 async def get_all_power(
-    svc: Annotated[ReportService, Depends(get_report_service)],
+    svc: Annotated[AsyncReportService, Depends(get_report_service)],
+    page: Annotated[ReportPage, Depends(get_report_page)],
+    response: Response,
 ):
-    return svc.get_all_power()
+    powers = await svc.get_all_power(page)
+    set_next_cursor(response, page, powers)
+    return powers
 
 
 @router.get(
     "/eq",
-    response_model=list[Eq],
+    response_model=list[ReadEq],
 )
 async def get_all_eq(
-    svc: Annotated[ReportService, Depends(get_report_service)],
+    svc: Annotated[AsyncReportService, Depends(get_report_service)],
+    page: Annotated[ReportPage, Depends(get_report_page)],
+    response: Response,
 ):
-    return svc.get_all_eq()
+    eqs = await svc.get_all_eq(page)
+    set_next_cursor(response, page, eqs)
+    return eqs
 
 
 @router.get(
@@ -34,6 +117,41 @@ async def get_all_eq(
     response_model=list[Dam],
 )
 async def get_all_dam(
-    svc: Annotated[ReportService, Depends(get_report_service)],
+    svc: Annotated[AsyncReportService, Depends(get_report_service)],
+    page: Annotated[ReportPage, Depends(get_report_page)],
+    response: Response,
+    name: str | None = None,
+):
+    dams = await svc.get_all_dam(page, name)
+    set_next_cursor(response, page, dams)
+    return dams
+
+
+@router.get("/power/export")
+async def export_power(
+    svc: Annotated[AsyncReportService, Depends(get_report_service)],
+    format: ExportFormat = ExportFormat.NDJSON,
+    since: int | None = None,
+    until: int | None = None,
+):
+    return export_response(svc, PowerArea, format, since, until)
+
+
+@router.get("/eq/export")
+async def export_eq(
+    svc: Annotated[AsyncReportService, Depends(get_report_service)],
+    format: ExportFormat = ExportFormat.NDJSON,
+    since: int | None = None,
+    until: int | None = None,
+):
+    return export_response(svc, Eq, format, since, until)
+
+
+@router.get("/dam/export")
+async def export_dam(
+    svc: Annotated[AsyncReportService, Depends(get_report_service)],
+    format: ExportFormat = ExportFormat.NDJSON,
+    since: int | None = None,
+    until: int | None = None,
 ):
-    return svc.get_all_dam()
+    return export_response(svc, Dam, format, since, until)
@@ -9,8 +9,8 @@ from meter.api import (
     get_rule_service,
 )
 from meter.constant.response_code import ResponseCode
-from meter.domain.issue import IssueService
-from meter.domain.rule import CreateRule, ReadRule, RuleService, UpdateRule
+from meter.domain.issue import AsyncIssueService
+from meter.domain.rule import AsyncRuleService, CreateRule, ReadRule, UpdateRule
 from meter.domain.smtp import EmailService
 from meter.domain.user import User
 from meter.helper import raise_custom_exception, raise_not_found_exception
@@ -24,12 +24,12 @@ router = APIRouter()
     response_model=ReadRule,
 )
 async def create_rule(
-    svc: Annotated[RuleService, Depends(get_rule_service)],
+    svc: Annotated[AsyncRuleService, Depends(get_rule_service)],
     user: Annotated[User, Depends(get_current_user)],
     input: CreateRule,
 ):
     try:
-        return svc.create(input, user)
+        return await svc.create(input, user)
     except Exception:
         raise_custom_exception(ResponseCode.RULE_CREATE_FAILED_1001)
 
@@ -40,10 +40,10 @@ async def create_rule(
     response_model=list[ReadRule],
 )
 async def get_rules(
-    svc: Annotated[RuleService, Depends(get_rule_service)],
+    svc: Annotated[AsyncRuleService, Depends(get_rule_service)],
     user: Annotated[User, Depends(get_current_user)],
 ):
-    return svc.get(user)
+    return await svc.get(user)
 
 
 @router.get(
@@ -51,11 +51,11 @@ async def get_rules(
     response_model=ReadRule,
 )
 async def show_rule(
-    svc: Annotated[RuleService, Depends(get_rule_service)],
+    svc: Annotated[AsyncRuleService, Depends(get_rule_service)],
     user: Annotated[User, Depends(get_current_user)],
     id: int,
 ):
-    rule = svc.show(user, id)
+    rule = await svc.show(user, id)
     if rule is None:
         raise_not_found_exception()
 
@@ -67,7 +67,7 @@ async def show_rule(
     response_model=ReadRule,
 )
 async def update_rule(
-    svc: Annotated[RuleService, Depends(get_rule_service)],
+    svc: Annotated[AsyncRuleService, Depends(get_rule_service)],
     user: Annotated[User, Depends(get_current_user)],
     id: int,
     input: UpdateRule,
@@ -75,7 +75,7 @@ async def update_rule(
     rule = None
 
     try:
-        rule = svc.update(id, input, user)
+        rule = await svc.update(id, input, user)
     except Exception:
         raise_custom_exception(ResponseCode.RULE_UPDATE_FAILED_1002)
 
@@ -87,14 +87,14 @@ async def update_rule(
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_rule(
-    svc: Annotated[RuleService, Depends(get_rule_service)],
+    svc: Annotated[AsyncRuleService, Depends(get_rule_service)],
     user: Annotated[User, Depends(get_current_user)],
     id: int,
 ):
     success = False
 
     try:
-        success = svc.delete(id, user)
+        success = await svc.delete(id, user)
     except Exception:
         raise_custom_exception(ResponseCode.RULE_DELETE_FAILED_1003)
 
@@ -104,14 +104,14 @@ async def delete_rule(
 
 @router.put("/{id}/enable", status_code=status.HTTP_204_NO_CONTENT)
 async def enable_rule(
-    svc: Annotated[RuleService, Depends(get_rule_service)],
+    svc: Annotated[AsyncRuleService, Depends(get_rule_service)],
     user: Annotated[User, Depends(get_current_user)],
     id: int,
 ):
     success = False
 
     try:
-        success = svc.enable(id, user)
+        success = await svc.enable(id, user)
     except Exception:
         raise_custom_exception(ResponseCode.RULE_ENABLE_FAILED_1004)
 
@@ -121,14 +121,14 @@ async def enable_rule(
 
 @router.put("/{id}/disable", status_code=status.HTTP_204_NO_CONTENT)
 async def disable_rule(
-    svc: Annotated[RuleService, Depends(get_rule_service)],
+    svc: Annotated[AsyncRuleService, Depends(get_rule_service)],
     user: Annotated[User, Depends(get_current_user)],
     id: int,
 ):
     success = False
 
     try:
-        success = svc.disable(id, user)
+        success = await svc.disable(id, user)
     except Exception:
         raise_custom_exception(ResponseCode.RULE_DISABLE_FAILED_1005)
 
@@ -138,21 +138,22 @@ async def disable_rule(
 
 @router.put("/{id}/trigger", status_code=status.HTTP_204_NO_CONTENT)
 async def trigger_alert(
-    rule_svc: Annotated[RuleService, Depends(get_rule_service)],
-    issue_svc: Annotated[IssueService, Depends(get_issue_service)],
+    rule_svc: Annotated[AsyncRuleService, Depends(get_rule_service)],
+    issue_svc: Annotated[AsyncIssueService, Depends(get_issue_service)],
     email_svc: Annotated[EmailService, Depends(get_email_service)],
     user: Annotated[User, Depends(get_current_user)],
     id: int,
 ):
-    rule = rule_svc.show(user, id)
+    rule = await rule_svc.show(user, id)
     if rule is None:
         raise_not_found_exception()
 
     try:
-        issue = issue_svc.create(rule)
+        issue = await issue_svc.create(rule)
         if issue is None:
             raise Exception
 
-        email_svc.send_noreply([user.email], issue.title, issue.content)
+        # a full queue fails the request instead of blocking the event loop
+        email_svc.send_noreply([user.email], issue.title, issue.content, block=False)
     except Exception:
         raise_custom_exception(ResponseCode.RULE_TRIGGER_FAILED_1006)
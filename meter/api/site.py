@@ -0,0 +1,110 @@
+from typing import Annotated
+
+from fastapi import APIRouter, BackgroundTasks, Depends, status
+from sqlalchemy.engine import Engine
+
+from crawler.model import EqSite
+from meter.api import get_admin_user, get_engine, get_site_service
+from meter.constant.response_code import ResponseCode
+from meter.domain.site import (
+    AsyncSiteService,
+    CreateSite,
+    UpdateSite,
+    estimate_site_intensities,
+)
+from meter.domain.user import User
+from meter.helper import raise_custom_exception, raise_not_found_exception
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    response_model=list[EqSite],
+)
+async def get_sites(
+    svc: Annotated[AsyncSiteService, Depends(get_site_service)],
+):
+    return await svc.get()
+
+
+@router.get(
+    "/{name}",
+    response_model=EqSite,
+)
+async def show_site(
+    svc: Annotated[AsyncSiteService, Depends(get_site_service)],
+    name: str,
+):
+    site = await svc.show(name)
+    if site is None:
+        raise_not_found_exception()
+
+    return site
+
+
+@router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=EqSite,
+)
+async def create_site(
+    svc: Annotated[AsyncSiteService, Depends(get_site_service)],
+    user: Annotated[User, Depends(get_admin_user)],
+    engine: Annotated[Engine, Depends(get_engine)],
+    background_tasks: BackgroundTasks,
+    input: CreateSite,
+):
+    site = None
+
+    try:
+        site = await svc.create(input)
+    except Exception:
+        raise_custom_exception(ResponseCode.SITE_CREATE_FAILED_1401)
+
+    # the history is estimated after the response is sent
+    background_tasks.add_task(estimate_site_intensities, engine, site.name)
+    return site
+
+
+@router.patch(
+    "/{name}",
+    response_model=EqSite,
+)
+async def update_site(
+    svc: Annotated[AsyncSiteService, Depends(get_site_service)],
+    user: Annotated[User, Depends(get_admin_user)],
+    name: str,
+    engine: Annotated[Engine, Depends(get_engine)],
+    background_tasks: BackgroundTasks,
+    input: UpdateSite,
+):
+    site = None
+
+    try:
+        site = await svc.update(name, input)
+    except Exception:
+        raise_custom_exception(ResponseCode.SITE_UPDATE_FAILED_1402)
+
+    if site is None:
+        raise_not_found_exception()
+
+    background_tasks.add_task(estimate_site_intensities, engine, site.name)
+    return site
+
+
+@router.delete("/{name}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_site(
+    svc: Annotated[AsyncSiteService, Depends(get_site_service)],
+    user: Annotated[User, Depends(get_admin_user)],
+    name: str,
+):
+    success = False
+
+    try:
+        success = await svc.delete(name)
+    except Exception:
+        raise_custom_exception(ResponseCode.SITE_DELETE_FAILED_1403)
+
+    if not success:
+        raise_not_found_exception()
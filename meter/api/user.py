@@ -6,7 +6,7 @@ from sqlalchemy.exc import IntegrityError
 
 from meter.api import get_current_user, get_user_service
 from meter.constant.response_code import ResponseCode
-from meter.domain.user import User, UserService, UserSignup
+from meter.domain.user import AsyncUserService, User, UserSignup
 from meter.helper import raise_custom_exception
 
 router = APIRouter()
@@ -19,10 +19,10 @@ class SignupResponse(BaseModel):
 @router.post("/signup", status_code=status.HTTP_201_CREATED)
 async def signup(
     input: UserSignup,
-    svc: Annotated[UserService, Depends(get_user_service)],
+    svc: Annotated[AsyncUserService, Depends(get_user_service)],
 ):
     try:
-        id = svc.signup(input)
+        id = await svc.signup(input)
     except IntegrityError as e:
         orig = str(e.orig)
         if "name" in orig:
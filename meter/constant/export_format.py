@@ -0,0 +1,6 @@
+from meter.constant import ExtendedEnum
+
+
+class ExportFormat(ExtendedEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
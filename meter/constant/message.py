@@ -13,6 +13,11 @@ class Message(ExtendedEnum):
     ISSUE_DELETE_FAILED_1102 = "Delete failed."
 
     AUTH_WRONG_USERNAME_OR_PASSWORD_1201 = "Login failed. Wrong username or password."
+    AUTH_SEND_EMAIL_FAILED_1202 = "Send email failed. Please try again later."
 
     USER_SIGNUP_DUPLICATE_USERNAME_1301 = "Sign up failed. Duplicated username."
     USER_SIGNUP_DUPLICATE_EMAIL_1302 = "Sign up failed. Duplicated email."
+
+    SITE_CREATE_FAILED_1401 = "Create failed."
+    SITE_UPDATE_FAILED_1402 = "Update failed."
+    SITE_DELETE_FAILED_1403 = "Delete failed."
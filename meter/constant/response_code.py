@@ -13,6 +13,11 @@ class ResponseCode(ExtendedEnum):
     ISSUE_DELETE_FAILED_1102 = "1102"
 
     AUTH_WRONG_USERNAME_OR_PASSWORD_1201 = "1201"
+    AUTH_SEND_EMAIL_FAILED_1202 = "1202"
 
     USER_SIGNUP_DUPLICATE_USERNAME_1301 = "1301"
     USER_SIGNUP_DUPLICATE_EMAIL_1302 = "1302"
+
+    SITE_CREATE_FAILED_1401 = "1401"
+    SITE_UPDATE_FAILED_1402 = "1402"
+    SITE_DELETE_FAILED_1403 = "1403"
@@ -31,7 +31,8 @@ class RulePosition(ExtendedEnum):
     CENTRAL_ELECTRICITY = "CENTRAL" + ELECTRICITY_SUFFIX
     NORTH_ELECTRICITY = "NORTH" + ELECTRICITY_SUFFIX
 
-    # Earthquake
-    HSINCHU_EARTHQUAKE = "HSINCHU_EARTHQUAKE"
-    TAICHUNG_EARTHQUAKE = "TAICHUNG_EARTHQUAKE"
-    TAINAN_EARTHQUAKE = "TAINAN_EARTHQUAKE"
+    # Earthquake, prefixed by the name of an `EqSite`
+    EARTHQUAKE_SUFFIX = "_EARTHQUAKE"
+    HSINCHU_EARTHQUAKE = "HSINCHU" + EARTHQUAKE_SUFFIX
+    TAICHUNG_EARTHQUAKE = "TAICHUNG" + EARTHQUAKE_SUFFIX
+    TAINAN_EARTHQUAKE = "TAINAN" + EARTHQUAKE_SUFFIX
@@ -6,3 +6,5 @@ FOLDER = "./meter/template"
 class TemplatePath(ExtendedEnum):
     ISSUE_TITLE = f"{FOLDER}/automated_generate_issue_title.template"
     ISSUE_CONTENT = f"{FOLDER}/automated_generate_issue_content.template"
+    DIGEST_TITLE = f"{FOLDER}/automated_generate_digest_title.template"
+    DIGEST_CONTENT = f"{FOLDER}/automated_generate_digest_content.template"
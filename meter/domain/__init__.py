@@ -1,6 +1,18 @@
+from typing import Callable, Generic, TypeVar
+
 from pydantic import BaseModel, EmailStr
-from sqlalchemy.engine import Engine
-from sqlmodel import SQLModel, create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from crawler.model.migration import migrate
+
+# asyncio DBAPI drivers used by `get_async_engine`
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
 
 
 class SQLEngineParam(BaseModel):
@@ -19,6 +31,20 @@ class SMTPServerParam(BaseModel):
     port: int
     noreply: EmailStr
     noreply_password: str | None
+    # persistent connections, each sending from its own thread
+    workers: int = 2
+    # emails waiting to be sent, `EmailService.send` blocks while it is full
+    queue_size: int = 1000
+    # seconds to wait for room in the queue
+    queue_timeout: float = 30
+    retries: int = 3
+    # seconds before the first retry, doubled on each one
+    backoff: float = 1
+    # messages sent on a connection before it is renewed
+    max_messages: int = 100
+    # seconds an idle connection is kept
+    idle_timeout: float = 60
+    timeout: float = 30
 
 
 def get_engine(param: SQLEngineParam):
@@ -26,7 +52,35 @@ def get_engine(param: SQLEngineParam):
     return engine
 
 
+def get_async_engine(param: SQLEngineParam) -> AsyncEngine:
+    url = make_url(param.url)
+    backend = url.get_backend_name()
+    url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return create_async_engine(url, connect_args=param.connect_args)
+
+
+Service = TypeVar("Service")
+T = TypeVar("T")
+
+
+class AsyncService(Generic[Service]):
+    """
+    Run a sync `{Domain}Service` on an `AsyncSession`, so the queries are
+    awaited instead of blocking the event loop, and the domain logic stays
+    in one place for both sync (e.g. celery tasks) and async callers.
+    """
+
+    service: Callable[[Session], Service]
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def run(self, fn: Callable[[Service], T]) -> T:
+        return await self.session.run_sync(lambda session: fn(self.service(session)))
+
+
 # TODO: this might not be the correct type?
 # https://github.com/tiangolo/sqlmodel/blob/43a689d369f52b72aac60efd71111aba7d84714d/sqlmodel/engine/create.py#L78
 def create_db_and_tables(engine: Engine):
     SQLModel.metadata.create_all(engine)
+    migrate(engine)
@@ -9,6 +9,14 @@ class AuthConfig(BaseModel):
     secret_key: str
     algorithm: str
     default_ttl_sec: int
+    # seconds a resolved token is reused by `get_current_user`
+    user_cache_ttl_sec: int = 60
+    # cost factor of new password digests, weaker ones are rehashed on login
+    bcrypt_rounds: int = 12
+    # threads hashing passwords at once
+    password_workers: int = 2
+    # names of the users who may change the earthquake sites
+    admins: list[str] = []
 
 
 class AuthService:
@@ -6,9 +6,13 @@ from sqlmodel import Field, Relationship, Session, SQLModel, select
 
 from meter.constant.issue_status import IssueStatus
 from meter.constant.template_path import TemplatePath
+from meter.domain import AsyncService
 from meter.domain.rule import Rule
 from meter.domain.user import User
-from meter.helper import get_formatted_string_from_template
+from meter.helper import (
+    get_formatted_string_from_template,
+    get_formatted_strings_from_template,
+)
 
 
 class IssueBase(SQLModel):
@@ -60,6 +64,22 @@ class ReadIssueDetail(ReadIssue):
     rule: Rule
 
 
+def get_digest(issues: list[Issue]) -> tuple[str, str]:
+    """Title and content of one email notifying all of `issues`."""
+    if len(issues) == 1:
+        return issues[0].title, issues[0].content
+
+    title = get_formatted_string_from_template(
+        TemplatePath.DIGEST_TITLE.value,
+        count=len(issues),
+    )
+    content = get_formatted_string_from_template(
+        TemplatePath.DIGEST_CONTENT.value,
+        issues="\n".join(f"- {issue.title}" for issue in issues),
+    )
+    return title, content
+
+
 class IssueService:
     def __init__(self, session: Session) -> None:
         self.session = session
@@ -79,21 +99,27 @@ class IssueService:
         results = self.session.exec(statement)
         return results.first()
 
-    def create(self, rule: Rule) -> Issue:
-        rule_name = rule.name or rule.id
-
-        issue = Issue(
+    def __new_issue(self, rule: Rule, title: str, content: str) -> Issue:
+        return Issue(
             user_id=rule.user_id,
             rule_id=rule.id,
-            title=get_formatted_string_from_template(
-                TemplatePath.ISSUE_TITLE.value,
-                rule_name=rule_name,
-            ),
-            content=get_formatted_string_from_template(
-                TemplatePath.ISSUE_CONTENT.value
-            ),
+            title=title,
+            content=content,
             status=IssueStatus.CREATED.value,
         )
+
+    def __new_issues(self, rules: list[Rule]) -> list[Issue]:
+        titles = get_formatted_strings_from_template(
+            TemplatePath.ISSUE_TITLE.value,
+            [{"rule_name": rule.name or rule.id} for rule in rules],
+        )
+        content = get_formatted_string_from_template(TemplatePath.ISSUE_CONTENT.value)
+        return [
+            self.__new_issue(rule, title, content) for rule, title in zip(rules, titles)
+        ]
+
+    def create(self, rule: Rule) -> Issue:
+        (issue,) = self.__new_issues([rule])
         self.session.add(issue)
 
         try:
@@ -106,6 +132,27 @@ class IssueService:
         self.session.refresh(issue)
         return issue
 
+    def create_many(self, rules: list[Rule]) -> list[Issue]:
+        """
+        Insert the issues of `rules` in one statement and commit them, along
+        with anything else pending in the session. `id` of the returned issues
+        is not loaded.
+        """
+        issues = self.__new_issues(rules)
+        self.session.bulk_save_objects(issues)
+
+        try:
+            self.session.commit()
+        except Exception as e:
+            logging.error(
+                f"[create_many_issues] failed: rules = {[r.id for r in rules]}, "
+                f"exception = {e}!"
+            )
+            self.session.rollback()
+            raise e
+
+        return issues
+
     def get(self, user: User, filter: dict) -> list[Issue]:
         statement = select(Issue).where(Issue.user_id == user.id)
 
@@ -170,3 +217,28 @@ class IssueService:
             raise e
 
         return True
+
+
+class AsyncIssueService(AsyncService[IssueService]):
+    service = IssueService
+
+    def __load_rule(self, issue: Issue | None) -> Issue | None:
+        # `ReadIssueDetail` reads the rule after the session is out of reach
+        if issue is not None:
+            issue.rule
+        return issue
+
+    async def create(self, rule: Rule) -> Issue:
+        return await self.run(lambda svc: svc.create(rule))
+
+    async def get(self, user: User, filter: dict) -> list[Issue]:
+        return await self.run(lambda svc: svc.get(user, filter))
+
+    async def show(self, user: User, id: int) -> Issue | None:
+        return await self.run(lambda svc: self.__load_rule(svc.show(user, id)))
+
+    async def update(self, id: int, input: UpdateIssue, user: User) -> Issue | None:
+        return await self.run(lambda svc: self.__load_rule(svc.update(id, input, user)))
+
+    async def delete(self, id: int, user: User) -> bool:
+        return await self.run(lambda svc: svc.delete(id, user))
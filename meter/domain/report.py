@@ -1,61 +1,174 @@
-from sqlmodel import Session, select
+from collections import defaultdict
+from typing import Any, AsyncIterator, Mapping
 
-from crawler.model import Dam, Eq, Power, PowerReturn
+from pydantic import BaseModel
+from sqlmodel import Session, and_, or_, select
+
+from crawler.model import (
+    DAM_REGIONS,
+    Dam,
+    DamRegion,
+    Eq,
+    EqIntensity,
+    EqSite,
+    Power,
+    PowerArea,
+    ReadEq,
+)
+from meter.domain import AsyncService
+
+# rows fetched from the server-side cursor at once when exporting
+EXPORT_BATCH_SIZE = 1000
+
+
+class ReportPage(BaseModel):
+    """Keyset pagination over (`timestamp`, `id`) of a report table."""
+
+    since: int | None = None
+    until: int | None = None
+    # (`timestamp`, `id`) of the last item in previous page
+    after: tuple[int, int] | None = None
+    limit: int = 100
+
+    @staticmethod
+    def cursor_of(item) -> str:
+        return f"{item.timestamp},{item.id}"
+
+    @staticmethod
+    def parse_cursor(cursor: str) -> tuple[int, int]:
+        timestamp, id = cursor.split(",")
+        return int(timestamp), int(id)
 
 
 class ReportService:
     def __init__(self, session: Session) -> None:
         self.session = session
 
-    def get_all_power(self) -> list[PowerReturn]:
-        powers = self.session.exec(select(Power)).all()
-        new_powers = []
-        for power in powers:
-            power = power.dict()
-            whole = {
-                "load": 0,
-                "max_supply": 0,
-                "recv_rate": None,
-            }
-            for k in ("east", "central", "south", "north"):
-                whole["load"] += power[k]["load"]
-                if k != "east":
-                    whole["max_supply"] += power[k]["max_supply"]
-
-            whole["recv_rate"] = (
-                ((whole["max_supply"] - whole["load"]) / whole["load"] * 100)
-                if whole["load"] != 0
-                else 1000
+    def __paginate(self, model, page: ReportPage):
+        statement = select(model)
+        if page.since is not None:
+            statement = statement.where(model.timestamp >= page.since)
+        if page.until is not None:
+            statement = statement.where(model.timestamp < page.until)
+        if page.after is not None:
+            timestamp, id = page.after
+            statement = statement.where(model.timestamp >= timestamp).where(
+                or_(
+                    model.timestamp > timestamp,
+                    and_(model.timestamp == timestamp, model.id > id),
+                )
             )
-            power["whole"] = whole
-            new_powers.append(PowerReturn(**power))
-
-        return new_powers
-
-    def get_all_eq(self) -> list[Eq]:
-        return self.session.exec(select(Eq)).all()
-
-    def get_all_dam(self) -> list[Dam]:
-        dams = self.session.exec(select(Dam)).all()
-        keys = [["石門", "寶山第二", "永和山"], ["鯉魚潭", "德基"], ["南化", "曾文", "烏山頭"]]
-        names = ["竹", "中", "南"]
-        for key, name in zip(keys, names):
-            storage = 0
-            all_storage = 0
-            for mia in key:
-                dam = self.session.exec(
-                    select(Dam).where(Dam.name == f"{mia}水庫").order_by(-Dam.timestamp)
-                ).first()
-                if dam is not None:
-                    storage += dam.storage
-                    if dam.percent != 0:
-                        all_storage += dam.storage / dam.percent
+        return statement.order_by(model.timestamp, model.id).limit(page.limit)
+
+    def get_all_power(self, page: ReportPage = ReportPage()) -> list[Power]:
+        # one "whole" row per timestamp, so paginate on them
+        statement = self.__paginate(PowerArea, page).where(PowerArea.region == "whole")
+        wholes = self.session.exec(statement).all()
+        if len(wholes) == 0:
+            return []
+
+        statement = select(PowerArea).where(
+            PowerArea.timestamp >= wholes[0].timestamp,
+            PowerArea.timestamp <= wholes[-1].timestamp,
+        )
+        areas = defaultdict(list)
+        for area in self.session.exec(statement):
+            areas[area.timestamp].append(area)
+        return [PowerArea.to_report(areas[w.timestamp]) for w in wholes]
+
+    def get_all_eq(self, page: ReportPage = ReportPage()) -> list[ReadEq]:
+        eqs = self.session.exec(self.__paginate(Eq, page)).all()
+        if len(eqs) == 0:
+            return []
+
+        statement = select(EqIntensity).where(
+            EqIntensity.eq_id.in_([eq.id for eq in eqs])
+        )
+        intensities = defaultdict(dict)
+        for i in self.session.exec(statement):
+            intensities[i.eq_id][i.site] = i.intensity
+        return [eq.to_report(intensities[eq.id]) for eq in eqs]
+
+    def get_all_dam(
+        self,
+        page: ReportPage = ReportPage(),
+        name: str | None = None,
+    ) -> list[Dam]:
+        statement = self.__paginate(Dam, page)
+        if name is not None:
+            statement = statement.where(Dam.name == name)
+        dams = self.session.exec(statement).all()
+
+        # regional summaries are only attached to the first page
+        if page.after is not None or name is not None:
+            return dams
+
+        regions = {r.name: r for r in self.session.exec(select(DamRegion))}
+        for region_name in DAM_REGIONS:
+            region = regions.get(region_name)
+            if region is None:
+                continue
+            # the summaries are the latest, keep them out of older windows
+            if page.since is not None and region.timestamp < page.since:
+                continue
+            if page.until is not None and region.timestamp >= page.until:
+                continue
             dams.append(
                 Dam(
-                    name=name,
-                    timestamp=0,
-                    storage=storage,
-                    percent=0 if all_storage == 0 else storage / all_storage,
+                    name=region.name,
+                    timestamp=region.timestamp,
+                    storage=region.storage,
+                    percent=region.percent,
                 )
             )
         return dams
+
+
+class AsyncReportService(AsyncService[ReportService]):
+    service = ReportService
+
+    async def get_all_power(self, page: ReportPage = ReportPage()) -> list[Power]:
+        return await self.run(lambda svc: svc.get_all_power(page))
+
+    async def get_all_eq(self, page: ReportPage = ReportPage()) -> list[ReadEq]:
+        return await self.run(lambda svc: svc.get_all_eq(page))
+
+    async def get_all_dam(
+        self,
+        page: ReportPage = ReportPage(),
+        name: str | None = None,
+    ) -> list[Dam]:
+        return await self.run(lambda svc: svc.get_all_dam(page, name))
+
+    async def export(
+        self,
+        model,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> AsyncIterator[Mapping[str, Any]]:
+        """Stream raw rows of a report table with a server-side cursor."""
+        table = model.__table__
+        statement = select(table)
+        if model is Eq:
+            # intensity at every site as a column, looked up by primary key
+            sites = (await self.session.exec(select(EqSite.name))).all()
+            statement = statement.add_columns(
+                *(
+                    select(EqIntensity.intensity)
+                    .where(EqIntensity.eq_id == table.c.id, EqIntensity.site == site)
+                    .scalar_subquery()
+                    .label(f"intensity_{site.lower()}")
+                    for site in sites
+                )
+            )
+        if since is not None:
+            statement = statement.where(table.c.timestamp >= since)
+        if until is not None:
+            statement = statement.where(table.c.timestamp < until)
+        statement = statement.order_by(table.c.timestamp, table.c.id).execution_options(
+            yield_per=EXPORT_BATCH_SIZE
+        )
+
+        result = await self.session.stream(statement)
+        async for row in result.mappings():
+            yield row
@@ -7,6 +7,7 @@ from sqlmodel import Field, Relationship, Session, SQLModel, select
 from meter.constant.rule_operator import RuleOperator
 from meter.constant.rule_position import RulePosition
 from meter.constant.rule_resource import RuleResource
+from meter.domain import AsyncService
 from meter.domain.user import User
 
 
@@ -30,6 +31,13 @@ class Rule(RuleBase, table=True):
     last_triggered_by: Optional[datetime] = Field(default=None, nullable=True)
 
 
+class RuleCursor(SQLModel, table=True):
+    """The newest data timestamp which rules of a position have been evaluated on."""
+
+    position: RulePosition = Field(primary_key=True)
+    timestamp: int
+
+
 class CreateRule(SQLModel):
     name: Optional[str]
     position: RulePosition
@@ -174,3 +182,28 @@ class RuleService:
             raise e
 
         return True
+
+
+class AsyncRuleService(AsyncService[RuleService]):
+    service = RuleService
+
+    async def create(self, input: CreateRule, user: User) -> Rule:
+        return await self.run(lambda svc: svc.create(input, user))
+
+    async def get(self, user: User) -> list[Rule]:
+        return await self.run(lambda svc: svc.get(user))
+
+    async def show(self, user: User, id: int) -> Rule | None:
+        return await self.run(lambda svc: svc.show(user, id))
+
+    async def update(self, id: int, input: UpdateRule, user: User) -> Rule | None:
+        return await self.run(lambda svc: svc.update(id, input, user))
+
+    async def delete(self, id: int, user: User) -> bool:
+        return await self.run(lambda svc: svc.delete(id, user))
+
+    async def enable(self, id: int, user: User) -> bool:
+        return await self.run(lambda svc: svc.enable(id, user))
+
+    async def disable(self, id: int, user: User) -> bool:
+        return await self.run(lambda svc: svc.disable(id, user))
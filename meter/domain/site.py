@@ -0,0 +1,131 @@
+import logging
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, delete, select
+
+from crawler.intensity import SITES
+from crawler.model import EqIntensity, EqSite, update_site_intensities
+from meter.domain import AsyncService
+
+
+class CreateSite(SQLModel):
+    name: str
+    lon: float
+    lat: float
+    factor: float
+
+
+class UpdateSite(SQLModel):
+    lon: Optional[float]
+    lat: Optional[float]
+    factor: Optional[float]
+
+
+class SiteService:
+    """
+    Registry of the sites where earthquake intensities are estimated. The
+    intensity history of a site is estimated again, by `estimate`, whenever
+    it is changed.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def get(self) -> list[EqSite]:
+        return self.session.exec(select(EqSite).order_by(EqSite.name)).all()
+
+    def show(self, name: str) -> EqSite | None:
+        return self.session.get(EqSite, name)
+
+    def create(self, input: CreateSite) -> EqSite:
+        site = EqSite.from_orm(input)
+        self.session.add(site)
+
+        try:
+            self.session.commit()
+        except Exception as e:
+            logging.error(f"[create_site] failed: input = {input}, exception = {e}!")
+            self.session.rollback()
+            raise e
+
+        self.session.refresh(site)
+        return site
+
+    def update(self, name: str, input: UpdateSite) -> EqSite | None:
+        site = self.show(name)
+        if site is None:
+            return None
+        # the intensities of the default sites come with the reports
+        if site.name in SITES:
+            raise ValueError(f"{site.name} is a default site")
+
+        site.lon = input.lon if input.lon is not None else site.lon
+        site.lat = input.lat if input.lat is not None else site.lat
+        site.factor = input.factor if input.factor is not None else site.factor
+
+        self.session.add(site)
+        try:
+            self.session.commit()
+        except Exception as e:
+            logging.error(f"[update_site] failed: name = {name}, exception = {e}!")
+            self.session.rollback()
+            raise e
+        self.session.refresh(site)
+
+        return site
+
+    def estimate(self, name: str) -> None:
+        site = self.show(name)
+        if site is None:
+            return
+
+        try:
+            update_site_intensities(self.session, site)
+        except Exception as e:
+            logging.error(f"[estimate_site] failed: name = {name}, exception = {e}!")
+            self.session.rollback()
+            raise e
+
+    def delete(self, name: str) -> bool:
+        site = self.show(name)
+        if site is None:
+            return False
+        # the default sites are watched by earthquake rules
+        if site.name in SITES:
+            raise ValueError(f"{site.name} is a default site")
+
+        self.session.execute(delete(EqIntensity).where(EqIntensity.site == name))
+        self.session.delete(site)
+        try:
+            self.session.commit()
+        except Exception as e:
+            logging.error(f"[delete_site] failed: name = {name}, exception = {e}!")
+            raise e
+
+        return True
+
+
+def estimate_site_intensities(engine: Engine, name: str) -> None:
+    """`SiteService.estimate` in a session of its own, e.g. after a response."""
+    with Session(engine) as session:
+        SiteService(session).estimate(name)
+
+
+class AsyncSiteService(AsyncService[SiteService]):
+    service = SiteService
+
+    async def get(self) -> list[EqSite]:
+        return await self.run(lambda svc: svc.get())
+
+    async def show(self, name: str) -> EqSite | None:
+        return await self.run(lambda svc: svc.show(name))
+
+    async def create(self, input: CreateSite) -> EqSite:
+        return await self.run(lambda svc: svc.create(input))
+
+    async def update(self, name: str, input: UpdateSite) -> EqSite | None:
+        return await self.run(lambda svc: svc.update(name, input))
+
+    async def delete(self, name: str) -> bool:
+        return await self.run(lambda svc: svc.delete(name))
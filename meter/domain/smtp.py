@@ -1,34 +1,241 @@
+import logging
+import os
+import smtplib
 import threading
+import time
+from email.message import Message
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from queue import Empty, Queue
 from smtplib import SMTP
 
+from pydantic import BaseModel
+
 from meter.domain import SMTPServerParam
 
 
+class SMTPPoolStats(BaseModel):
+    # waiting in the queue
+    queued: int
+    sending: int
+    sent: int
+    retried: int
+    failed: int
+    connections: int
+
+
+class SMTPPoolMetrics(SMTPPoolStats):
+    server: str
+    port: int
+    from_addr: str
+
+
+def retryable(e: Exception) -> bool:
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(e, smtplib.SMTPResponseException):
+        # 4xx are transient, e.g. 421 too many connections, 451 try again
+        return 400 <= e.smtp_code < 500
+    return isinstance(e, (smtplib.SMTPServerDisconnected, OSError))
+
+
+class SMTPPool:
+    """
+    Send the emails of `from_addr` from `config.workers` threads, each keeping
+    a persistent, logged in SMTP connection which sends many messages.
+    """
+
+    def __init__(
+        self,
+        config: SMTPServerParam,
+        from_addr: str,
+        password: str | None,
+    ) -> None:
+        self.config = config
+        self.from_addr = from_addr
+        self.password = password
+        self.queue: Queue[Message | None] = Queue(config.queue_size)
+        self.lock = threading.Lock()
+        self.stats = SMTPPoolStats(
+            queued=0, sending=0, sent=0, retried=0, failed=0, connections=0
+        )
+        self.closed = False
+        self.workers = [
+            threading.Thread(target=self.__work, name=f"smtp-{i}", daemon=True)
+            for i in range(config.workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, msg: Message, block: bool = True):
+        """
+        Queue `msg`, blocking while the queue is full. Raises `queue.Full`
+        after `config.queue_timeout` seconds, or at once if not `block`,
+        which is what callers on an event loop want.
+        """
+        if not block:
+            self.queue.put_nowait(msg)
+            return
+        self.queue.put(msg, timeout=self.config.queue_timeout)
+
+    def metrics(self) -> SMTPPoolStats:
+        with self.lock:
+            return self.stats.copy(update={"queued": self.queue.qsize()})
+
+    def join(self):
+        """Wait until every queued email is sent or given up."""
+        self.queue.join()
+
+    def close(self):
+        """Send the queued emails, then close the connections."""
+        self.closed = True
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+
+    def __count(self, **deltas: int):
+        with self.lock:
+            for k, v in deltas.items():
+                setattr(self.stats, k, getattr(self.stats, k) + v)
+
+    def __connect(self) -> SMTP:
+        server = SMTP(self.config.server, self.config.port, timeout=self.config.timeout)
+        if self.password is not None:
+            try:
+                server.login(self.from_addr, self.password)
+            except Exception:
+                server.close()
+                raise
+        self.__count(connections=1)
+        return server
+
+    def __quit(self, server: SMTP | None) -> None:
+        if server is None:
+            return
+        self.__count(connections=-1)
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def __reset(self, server: SMTP | None, e: Exception) -> SMTP | None:
+        """The connection to go on with after `e`, if it is still usable."""
+        rejected = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+        if server is not None and isinstance(e, rejected):
+            try:
+                server.rset()
+                return server
+            except (smtplib.SMTPException, OSError):
+                pass
+        self.__quit(server)
+        return None
+
+    def __work(self):
+        server: SMTP | None = None
+        # messages sent on `server`
+        sent = 0
+        while True:
+            try:
+                msg = self.queue.get(timeout=self.config.idle_timeout)
+            except Empty:
+                self.__quit(server)
+                server = None
+                continue
+            if msg is None:
+                self.__quit(server)
+                self.queue.task_done()
+                return
+
+            self.__count(sending=1)
+            for retry in range(self.config.retries + 1):
+                try:
+                    if server is None or sent >= self.config.max_messages:
+                        self.__quit(server)
+                        server, sent = None, 0
+                        server = self.__connect()
+                    server.send_message(msg)
+                    sent += 1
+                    self.__count(sent=1)
+                    break
+                except Exception as e:
+                    server = self.__reset(server, e)
+                    if retry == self.config.retries or not retryable(e):
+                        logging.error(f"[smtp] failed: to = {msg['To']}, {e!r}")
+                        self.__count(failed=1)
+                        break
+                    self.__count(retried=1)
+                    time.sleep(self.config.backoff * 2**retry)
+            self.__count(sending=-1)
+            self.queue.task_done()
+
+
+# one pool for each sender of each server in a process
+_pools: dict[tuple[str, int, str], SMTPPool] = {}
+_pools_pid = os.getpid()
+_pools_lock = threading.Lock()
+
+
+def get_pool(config: SMTPServerParam, from_addr: str, password: str | None):
+    global _pools_pid
+    key = (config.server, config.port, from_addr)
+    with _pools_lock:
+        # threads do not survive `fork()`, start others in the child
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None or pool.closed:
+            pool = _pools[key] = SMTPPool(config, from_addr, password)
+        return pool
+
+
+def pool_metrics() -> list[SMTPPoolMetrics]:
+    """Metrics of every SMTP pool of this process."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return [
+        SMTPPoolMetrics(
+            server=server, port=port, from_addr=from_addr, **pool.metrics().dict()
+        )
+        for (server, port, from_addr), pool in pools
+    ]
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
 class EmailService:
     def __init__(self, config: SMTPServerParam) -> None:
         self.config = config
 
-    def send(self, from_addr, password, to_addrs, subject, text, html):
-        with SMTP(self.config.server, self.config.port) as server:
-            if password is not None:
-                server.login(from_addr, password)
-            msg = MIMEMultipart("alternative")
-            msg["From"] = from_addr
-            msg["To"] = ", ".join(to_addrs)
-            msg["Subject"] = subject
-            msg.attach(MIMEText(text, "plain"))
-            msg.attach(MIMEText(html, "html"))
-            server.send_message(msg, from_addr, to_addrs)
-
-    def send_noreply(self, to_addrs, subject, text, html=None):
-        args = (
+    @staticmethod
+    def message(from_addr, to_addrs, subject, text, html) -> Message:
+        msg = MIMEMultipart("alternative")
+        msg["From"] = from_addr
+        msg["To"] = ", ".join(to_addrs)
+        msg["Subject"] = subject
+        msg.attach(MIMEText(text, "plain"))
+        msg.attach(MIMEText(html, "html"))
+        return msg
+
+    def send(self, from_addr, password, to_addrs, subject, text, html, block=True):
+        """Queue an email, sent by the SMTP pool of `from_addr`."""
+        msg = self.message(from_addr, to_addrs, subject, text, html)
+        get_pool(self.config, from_addr, password).submit(msg, block)
+
+    def send_noreply(self, to_addrs, subject, text, html=None, block=True):
+        self.send(
             self.config.noreply,
             self.config.noreply_password,
             to_addrs,
             subject,
             text,
             html or text,
+            block=block,
         )
-        threading.Thread(target=self.send, args=args).start()
@@ -1,19 +1,50 @@
-from typing import Optional
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, NamedTuple, Optional, TypeVar
 
-from passlib.hash import bcrypt
+from passlib.context import CryptContext
 from pydantic import EmailStr
 from sqlmodel import Field, Relationship, Session, SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from meter.domain import AsyncService
 
-def verify_password(
-    password: str,
-    digest: str,
-):
-    return bcrypt.verify(password, digest)
+T = TypeVar("T")
 
 
-def get_password_digest(password: str):
-    return bcrypt.hash(password)
+class PasswordHasher:
+    """
+    bcrypt with a configurable cost. Async callers run it in a bounded
+    thread pool: bcrypt releases the GIL, so hashing neither blocks the
+    event loop nor the other threads.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 2) -> None:
+        # digests of a lower cost are rehashed on login
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+        )
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="bcrypt")
+
+    def hash(self, password: str) -> str:
+        return self.context.hash(password)
+
+    def verify_and_update(self, password: str, digest: str) -> tuple[bool, str | None]:
+        """Whether `password` matches, and a new digest if `digest` should be upgraded."""
+        return self.context.verify_and_update(password, digest)
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+
+PASSWORD_HASHER = PasswordHasher()
 
 
 class UserBase(SQLModel):
@@ -41,15 +72,90 @@ class UserLogin(SQLModel):
     password: str
 
 
+class CachedUser(NamedTuple):
+    payload: dict[str, Any]
+    user: User
+    expires: float
+
+
+class UserCache:
+    """
+    Bounded TTL cache of the payload and `User` a JWT resolves to. An entry
+    never outlives the `exp` of its token, and the entries of a user are
+    dropped when the user is updated.
+
+    It is keyed by the raw token, which is its verified subject and expiry,
+    so a hit needs neither decoding nor a query.
+    """
+
+    def __init__(self, maxsize: int = 10000) -> None:
+        self.maxsize = maxsize
+        self.entries: OrderedDict[str, CachedUser] = OrderedDict()
+        # tokens of each subject
+        self.tokens: dict[str, set[str]] = {}
+        self.lock = threading.Lock()
+
+    def get(self, token: str) -> CachedUser | None:
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None:
+                return None
+            if entry.expires <= time.time():
+                self.__remove(token)
+                return None
+            self.entries.move_to_end(token)
+        # a copy for each request, not bound to any session
+        return entry._replace(user=User.from_orm(entry.user))
+
+    def set(self, token: str, payload: dict[str, Any], user: User, ttl: float):
+        expires = min(time.time() + ttl, payload.get("exp", float("inf")))
+        with self.lock:
+            self.__remove(token)
+            self.entries[token] = CachedUser(payload, User.from_orm(user), expires)
+            self.tokens.setdefault(user.name, set()).add(token)
+            while len(self.entries) > self.maxsize:
+                self.__remove(next(iter(self.entries)))
+
+    def invalidate(self, name: str) -> None:
+        with self.lock:
+            for token in list(self.tokens.get(name, ())):
+                self.__remove(token)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.tokens.clear()
+
+    def __remove(self, token: str) -> None:
+        entry = self.entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self.tokens[entry.user.name]
+        tokens.discard(token)
+        if len(tokens) == 0:
+            del self.tokens[entry.user.name]
+
+
+USER_CACHE = UserCache()
+
+
 class UserService:
-    def __init__(self, session: Session) -> None:
+    def __init__(
+        self,
+        session: Session,
+        hasher: PasswordHasher = PASSWORD_HASHER,
+    ) -> None:
         self.session = session
+        self.hasher = hasher
 
     def signup(self, input: UserSignup) -> str:
+        return self._create(input, self.hasher.hash(input.password))
+
+    def _create(self, input: UserSignup, digest: str) -> str:
         user = User(
             name=input.name,
             email=input.email.lower(),
-            password_digest=get_password_digest(input.password),
+            password_digest=digest,
         )
         self.session.add(user)
         try:
@@ -81,17 +187,71 @@ class UserService:
         except StopIteration:
             return None
 
+    def _get_by_login_name(self, name: str) -> User | None:
+        """The user of a name or email."""
+        user = self._get_by_name(name)
+        return user if user is not None else self._get_by_email(name)
+
+    def _update_digest(self, user: User, digest: str) -> None:
+        user.password_digest = digest
+        self.session.add(user)
+        self.session.commit()
+        USER_CACHE.invalidate(user.name)
+
     def login(self, input: UserLogin) -> User | None:
-        un = self._get_by_name(input.name)
-        ue = self._get_by_email(input.name)
-        user = un if un is not None else ue
+        user = self._get_by_login_name(input.name)
         if user is None:
             return None
-        if not verify_password(input.password, user.password_digest):
+        ok, digest = self.hasher.verify_and_update(input.password, user.password_digest)
+        if not ok:
             return None
+        if digest is not None:
+            self._update_digest(user, digest)
         return user
 
     def activate(self, user: User) -> None:
+        # `user` may be a cached copy, not loaded by this session
+        user = self.session.merge(user)
         user.active = True
-        self.session.add(user)
         self.session.commit()
+        USER_CACHE.invalidate(user.name)
+
+
+class AsyncUserService(AsyncService[UserService]):
+    service = UserService
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        hasher: PasswordHasher = PASSWORD_HASHER,
+    ) -> None:
+        super().__init__(session)
+        self.service = partial(UserService, hasher=hasher)
+        self.hasher = hasher
+
+    async def signup(self, input: UserSignup) -> str:
+        digest = await self.hasher.run(self.hasher.hash, input.password)
+        return await self.run(lambda svc: svc._create(input, digest))
+
+    async def get_by_id(self, id: str) -> UserRead | None:
+        return await self.run(lambda svc: svc.get_by_id(id))
+
+    async def _get_by_name(self, name: str) -> User | None:
+        return await self.run(lambda svc: svc._get_by_name(name))
+
+    async def login(self, input: UserLogin) -> User | None:
+        # only the queries run on the session, bcrypt runs in the pool
+        user = await self.run(lambda svc: svc._get_by_login_name(input.name))
+        if user is None:
+            return None
+        ok, digest = await self.hasher.run(
+            self.hasher.verify_and_update, input.password, user.password_digest
+        )
+        if not ok:
+            return None
+        if digest is not None:
+            await self.run(lambda svc: svc._update_digest(user, digest))
+        return user
+
+    async def activate(self, user: User) -> None:
+        return await self.run(lambda svc: svc.activate(user))
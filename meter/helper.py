@@ -1,3 +1,9 @@
+import os
+import time
+from glob import glob
+from string import Formatter
+from typing import Iterable, NamedTuple
+
 from fastapi import HTTPException, status
 
 from meter.constant.message import Message
@@ -17,6 +23,10 @@ def raise_unauthorized_exception():
     )
 
 
+def raise_forbidden_exception():
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+
+
 def raise_custom_exception(response_code: ResponseCode, status_code: int | None = None):
     args = {
         k: v
@@ -35,7 +45,69 @@ def get_message_by_response_code(response_code: ResponseCode) -> str:
     return Message[response_code.name].value.__str__()
 
 
+class Template(NamedTuple):
+    text: str
+    mtime: int
+    # the rendered text if it has no replacement fields
+    constant: str | None
+    checked_at: float
+
+
+class TemplateRegistry:
+    """
+    Template files read once and kept in memory. A file is checked for
+    changes, by its mtime, at most once every `check_interval` seconds.
+    """
+
+    def __init__(self, check_interval: float = 5) -> None:
+        self.check_interval = check_interval
+        self.templates: dict[str, Template] = {}
+
+    def load(self, path: str) -> Template:
+        now = time.monotonic()
+        template = self.templates.get(path)
+        if template is not None and now - template.checked_at < self.check_interval:
+            return template
+
+        mtime = os.stat(path).st_mtime_ns
+        if template is not None and template.mtime == mtime:
+            template = template._replace(checked_at=now)
+        else:
+            with open(path, "r") as f:
+                text = f.read()
+            fields = [name for _, name, _, _ in Formatter().parse(text) if name]
+            constant = None if len(fields) != 0 else text.format()
+            template = Template(text, mtime, constant, now)
+        self.templates[path] = template
+        return template
+
+    def load_folder(self, folder: str) -> None:
+        for path in sorted(glob(f"{folder}/*.template")):
+            self.load(path)
+
+    def render(self, path: str, **kwargs) -> str:
+        template = self.load(path)
+        if template.constant is not None:
+            return template.constant
+        return template.text.format(**kwargs)
+
+    def render_many(self, path: str, kwargs_list: Iterable[dict]) -> list[str]:
+        """Render `path` with each of `kwargs_list`, checking the file only once."""
+        template = self.load(path)
+        if template.constant is not None:
+            return [template.constant for _ in kwargs_list]
+        return [template.text.format(**kwargs) for kwargs in kwargs_list]
+
+
+TEMPLATES = TemplateRegistry()
+
+
 def get_formatted_string_from_template(path: str, **kwargs) -> str:
-    with open(path, "r") as f:
-        template = f.read()
-    return template.format(**kwargs)
+    return TEMPLATES.render(path, **kwargs)
+
+
+def get_formatted_strings_from_template(
+    path: str,
+    kwargs_list: Iterable[dict],
+) -> list[str]:
+    return TEMPLATES.render_many(path, kwargs_list)
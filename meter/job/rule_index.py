@@ -0,0 +1,91 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Iterable, List
+
+from meter.constant.rule_operator import RuleOperator
+from meter.constant.rule_position import RulePosition
+from meter.constant.rule_resource import RuleResource
+from meter.domain.rule import Rule
+
+
+class SortedRules:
+    """Rules sharing the same (position, resource, operator), sorted by value."""
+
+    def __init__(self, operator: RuleOperator, rules: Iterable[Rule]) -> None:
+        self.operator = operator
+        self.rules = sorted(rules, key=lambda r: r.value)
+        self.values = [r.value for r in self.rules]
+
+    def match(self, value: float) -> List[Rule]:
+        if self.operator == RuleOperator.EQUAL_TO:
+            lo = bisect_left(self.values, value)
+            hi = bisect_right(self.values, value)
+            return self.rules[lo:hi]
+        elif self.operator == RuleOperator.GREATER_THAN:
+            # value > rule.value
+            return self.rules[: bisect_left(self.values, value)]
+        elif self.operator == RuleOperator.GREATER_THAN_OR_EQUAL_TO:
+            # value >= rule.value
+            return self.rules[: bisect_right(self.values, value)]
+        elif self.operator == RuleOperator.LESS_THAN:
+            # value < rule.value
+            return self.rules[bisect_right(self.values, value) :]
+        else:  # LESS_THAN_OR_EQUAL_TO
+            # value <= rule.value
+            return self.rules[bisect_left(self.values, value) :]
+
+
+class RuleIndex:
+    """
+    Group rules by (position, resource, operator) so that one reading can be
+    matched against every rule of a position with a few binary searches.
+    """
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        groups: dict[tuple, list[Rule]] = defaultdict(list)
+        for rule in rules:
+            groups[(rule.position, rule.resource, rule.operator)].append(rule)
+
+        self.groups: dict[
+            RulePosition, list[tuple[RuleResource, SortedRules]]
+        ] = defaultdict(list)
+        for (position, resource, operator), group in groups.items():
+            self.groups[position].append((resource, SortedRules(operator, group)))
+
+    @property
+    def positions(self) -> list[RulePosition]:
+        return list(self.groups.keys())
+
+    def lower_bound(
+        self,
+        position: RulePosition,
+        resource: RuleResource,
+    ) -> float | None:
+        """
+        The smallest value of `resource` which may match a rule of `position`,
+        or None if a value of any size may.
+        """
+        bound = None
+        for r, rules in self.groups.get(position, []):
+            if r != resource:
+                continue
+            if rules.operator in (
+                RuleOperator.LESS_THAN,
+                RuleOperator.LESS_THAN_OR_EQUAL_TO,
+            ):
+                return None
+            bound = rules.values[0] if bound is None else min(bound, rules.values[0])
+        return bound
+
+    def match(
+        self,
+        position: RulePosition,
+        values: dict[RuleResource, float],
+    ) -> List[Rule]:
+        matched = []
+        for resource, rules in self.groups.get(position, []):
+            value = values.get(resource)
+            if value is None:
+                continue
+            matched.extend(rules.match(value))
+        return matched
@@ -1,16 +1,25 @@
+import logging
+from collections import defaultdict
 from datetime import datetime
-from typing import List
+from queue import Full
+from typing import List, NamedTuple
 
-from sqlmodel import Session, desc, select
+from sqlmodel import Session, and_, desc, func, select
 
-from crawler.model import Dam, Eq, Power
+from crawler.model import Dam, Eq, EqIntensity, PowerArea
 from meter.constant.dam_chinese_name import DamChineseName
-from meter.constant.rule_operator import RuleOperator
 from meter.constant.rule_position import RulePosition
 from meter.constant.rule_resource import RuleResource
-from meter.domain.issue import IssueService
-from meter.domain.rule import Rule
+from meter.domain.issue import IssueService, get_digest
+from meter.domain.rule import Rule, RuleCursor
 from meter.domain.smtp import EmailService
+from meter.domain.user import User
+from meter.job.rule_index import RuleIndex
+
+
+class Reading(NamedTuple):
+    timestamp: int
+    values: dict[RuleResource, float]
 
 
 class TriggerRuleJob:
@@ -23,6 +32,7 @@ class TriggerRuleJob:
         self.session = session
         self.email_svc = email_svc
         self.issue_svc = issue_svc
+        self.__pending_cursors: List[tuple[RuleCursor, int]] = []
 
     def is_reservoir(self, location: RulePosition):
         return location in [
@@ -68,140 +78,193 @@ class TriggerRuleJob:
         results = self.session.exec(statement)
         return results.all()
 
-    def __first_reservoir_by_operator(
+    def __get_latest_reservoirs(
         self,
-        position: RulePosition,
-        resource: RuleResource,
-        operator: RuleOperator,
-        value: float,
-        last_triggered_by: datetime | None,
-    ) -> Dam | None:
-        resource_str = resource.lower()
-        name = DamChineseName[position]
-
-        statement = (
-            select(Dam).where(Dam.name == name).order_by(desc(Dam.timestamp)).limit(1)
+        positions: List[RulePosition],
+    ) -> dict[RulePosition, Reading]:
+        names = {DamChineseName[p].value: p for p in positions}
+        if len(names) == 0:
+            return {}
+
+        # latest timestamp of each reservoir, then join back to get the row
+        latest = (
+            select(Dam.name, func.max(Dam.timestamp).label("timestamp"))
+            .where(Dam.name.in_(names.keys()))
+            .group_by(Dam.name)
+            .subquery()
+        )
+        statement = select(Dam).join(
+            latest,
+            and_(Dam.name == latest.c.name, Dam.timestamp == latest.c.timestamp),
         )
 
-        # avoid triggered by same data
-        if last_triggered_by is not None:
-            timestamp = int(last_triggered_by.timestamp())
-            statement = statement.where(Dam.timestamp != timestamp)
-
-        if operator == RuleOperator.EQUAL_TO:
-            statement = statement.where(getattr(Dam, resource_str) == value)
-        elif operator == RuleOperator.GREATER_THAN:
-            statement = statement.where(getattr(Dam, resource_str) > value)
-        elif operator == RuleOperator.GREATER_THAN_OR_EQUAL_TO:
-            statement = statement.where(getattr(Dam, resource_str) >= value)
-        elif operator == RuleOperator.LESS_THAN:
-            statement = statement.where(getattr(Dam, resource_str) < value)
-        elif operator == RuleOperator.LESS_THAN_OR_EQUAL_TO:
-            statement = statement.where(getattr(Dam, resource_str) <= value)
-
-        results = self.session.exec(statement)
-        return results.first()
+        readings = {}
+        for dam in self.session.exec(statement):
+            readings[names[dam.name]] = Reading(
+                timestamp=dam.timestamp,
+                values={
+                    RuleResource.STORAGE: dam.storage,
+                    RuleResource.PERCENT: dam.percent,
+                },
+            )
+        return readings
 
     def __get_latest_eletricity(
         self,
-    ) -> Power | None:
-        statement = select(Power).order_by(desc(Power.timestamp)).limit(1)
-        results = self.session.exec(statement)
-        return results.first()
-
-    def __get_all_earthquakes(self) -> List[Eq]:
-        statement = select(Eq.intensity, Eq.timestamp, Eq.id).order_by(
-            desc(Eq.timestamp)
+        positions: List[RulePosition],
+    ) -> dict[RulePosition, Reading]:
+        if len(positions) == 0:
+            return {}
+
+        latest = select(func.max(PowerArea.timestamp)).scalar_subquery()
+        statement = select(PowerArea).where(PowerArea.timestamp == latest)
+        areas = {a.region: a for a in self.session.exec(statement)}
+
+        readings = {}
+        for position in positions:
+            region = position.replace(RulePosition.ELECTRICITY_SUFFIX.value, "")
+            area = areas.get(region.lower())
+            if area is None:
+                continue
+            readings[position] = Reading(
+                timestamp=area.timestamp,
+                values={
+                    RuleResource.LOAD: area.load,
+                    RuleResource.MAX_SUPPLY: area.max_supply,
+                    RuleResource.RECV_RATE: area.recv_rate,
+                },
+            )
+        return readings
+
+    def __get_earthquake_cursors(
+        self,
+        positions: List[RulePosition],
+        latest: int,
+    ) -> dict[RulePosition, RuleCursor]:
+        statement = select(RuleCursor).where(RuleCursor.position.in_(positions))
+        cursors = {c.position: c for c in self.session.exec(statement)}
+
+        # start watching from the latest earthquake for new positions
+        for position in positions:
+            if position not in cursors:
+                cursors[position] = RuleCursor(position=position, timestamp=latest - 1)
+        return cursors
+
+    def __get_new_earthquakes(
+        self,
+        index: RuleIndex,
+        positions: List[RulePosition],
+    ) -> dict[RulePosition, List[Reading]]:
+        if len(positions) == 0:
+            return {}
+
+        latest = self.session.exec(select(func.max(Eq.timestamp))).one()
+        if latest is None:
+            return {}
+
+        readings = {}
+        for position, cursor in self.__get_earthquake_cursors(
+            positions, latest
+        ).items():
+            if cursor.timestamp >= latest:
+                continue
+
+            site = position.replace(RulePosition.EARTHQUAKE_SUFFIX.value, "")
+            statement = select(EqIntensity.timestamp, EqIntensity.intensity).where(
+                EqIntensity.site == site,
+                EqIntensity.timestamp > cursor.timestamp,
+            )
+            # skip earthquakes too weak for any rule, using the
+            # (site, intensity, timestamp) index
+            bound = index.lower_bound(position, RuleResource.INTENSITY)
+            if bound is not None:
+                statement = statement.where(EqIntensity.intensity >= bound)
+
+            readings[position] = [
+                Reading(timestamp=timestamp, values={RuleResource.INTENSITY: value})
+                for timestamp, value in self.session.exec(
+                    statement.order_by(desc(EqIntensity.timestamp))
+                )
+            ]
+            # advance the cursor only after the readings are evaluated
+            self.__pending_cursors.append((cursor, latest))
+        return readings
+
+    def __get_readings(self, index: RuleIndex) -> dict[RulePosition, List[Reading]]:
+        """Get readings of each position which are not evaluated yet, newest first."""
+        positions = index.positions
+        readings = {}
+        latest = self.__get_latest_reservoirs(
+            [p for p in positions if self.is_reservoir(p)]
+        ) | self.__get_latest_eletricity(
+            [p for p in positions if self.is_electricity(p)]
         )
-        results = self.session.exec(statement)
-        return results.fetchall()
-
-    def __first_earthquake_by_operator(self, rule: Rule) -> Eq | None:
-        if rule.position == RulePosition.HSINCHU_EARTHQUAKE:
-            index = 0
-        elif rule.position == RulePosition.TAICHUNG_EARTHQUAKE:
-            index = 1
-        else:  # RulePosition.TAINAN_EARTHQUAKE:
-            index = 2
-
-        earthquakes = self.__get_all_earthquakes()
-
-        for earthquake in earthquakes:
-            if self.__is_value_meet_rule(earthquake.intensity[index], rule):
-                return earthquake
-
-        return None
-
-    def __is_value_meet_rule(self, value: float, rule: Rule) -> bool:
-        if rule.operator == RuleOperator.EQUAL_TO:
-            return value == rule.value
-        elif rule.operator == RuleOperator.GREATER_THAN:
-            return value > rule.value
-        elif rule.operator == RuleOperator.GREATER_THAN_OR_EQUAL_TO:
-            return value >= rule.value
-        elif rule.operator == RuleOperator.LESS_THAN:
-            return value < rule.value
-        else:  # LESS_THAN_OR_EQUAL_TO
-            return value <= rule.value
-
-    def __create_issue_and_send_email(self, rule: Rule) -> bool:
-        issue = self.issue_svc.create(rule)
-        if issue is None:
-            return False
+        for position, reading in latest.items():
+            readings[position] = [reading]
+        readings |= self.__get_new_earthquakes(
+            index,
+            [p for p in positions if self.is_earthquake(p)],
+        )
+        return readings
 
-        self.email_svc.send_noreply([rule.user.email], issue.title, issue.content)
-        return True
+    def __is_triggered_by(self, rule: Rule, timestamp: int) -> bool:
+        if rule.last_triggered_by is None:
+            return False
+        return int(rule.last_triggered_by.timestamp()) >= timestamp
+
+    def __create_issues_and_send_emails(self, rules: List[Rule]) -> None:
+        user_ids = list({rule.user_id for rule in rules})
+        statement = select(User.id, User.email).where(User.id.in_(user_ids))
+        emails = dict(self.session.exec(statement).all())
+
+        # committed along with the triggered rules and cursors
+        issues = self.issue_svc.create_many(rules)
+
+        # one digest email per user. Alerts are emailed at most once: the
+        # issues are already saved, so a digest which can not be queued is
+        # logged and dropped, and the others are still sent.
+        issues_of_user = defaultdict(list)
+        for issue in issues:
+            issues_of_user[issue.user_id].append(issue)
+        for user_id, user_issues in issues_of_user.items():
+            title, content = get_digest(user_issues)
+            try:
+                self.email_svc.send_noreply(
+                    [emails[user_id]], title, content, block=False
+                )
+            except Full:
+                logging.error(
+                    f"[trigger_rule] email queue full: user_id = {user_id},"
+                    f" issues = {[issue.id for issue in user_issues]}!"
+                )
 
     def trigger_over_threshold(
         self,
     ) -> None:
-        rules = self.__get_all_enable_rules()
-
-        for rule in rules:
-            if self.is_reservoir(rule.position):
-                dam = self.__first_reservoir_by_operator(
-                    rule.position,
-                    rule.resource,
-                    rule.operator,
-                    rule.value,
-                    rule.last_triggered_by,
-                )
-                if dam is None:
-                    continue
-
-                notify_successfuly = self.__create_issue_and_send_email(rule)
-                if not notify_successfuly:
-                    continue
-
-                rule.last_triggered_by = datetime.fromtimestamp(dam.timestamp)
-
-            elif self.is_electricity(rule.position):
-                power = self.__get_latest_eletricity()
-                if power is None:
-                    continue
-
-                position_without_suffix = rule.position.replace(
-                    RulePosition.ELECTRICITY_SUFFIX.value, ""
-                )
-                column = getattr(power, position_without_suffix.lower())
-                if self.__is_value_meet_rule(column[rule.resource.lower()], rule):
-                    notify_successfuly = self.__create_issue_and_send_email(rule)
-                    if not notify_successfuly:
+        index = RuleIndex(self.__get_all_enable_rules())
+        readings = self.__get_readings(index)
+
+        triggered: List[Rule] = []
+        for position, position_readings in readings.items():
+            evaluated = set()
+            for reading in position_readings:
+                for rule in index.match(position, reading.values):
+                    # only the newest matched reading of each rule counts
+                    if rule.id in evaluated:
                         continue
+                    evaluated.add(rule.id)
 
-                    rule.last_triggered_by = datetime.fromtimestamp(power.timestamp)
-
-            elif self.is_earthquake(rule.position):
-                earthquake = self.__first_earthquake_by_operator(rule)
-                if earthquake is None:
-                    continue
-
-                notify_successfuly = self.__create_issue_and_send_email(rule)
-                if not notify_successfuly:
-                    continue
+                    # avoid triggered by same data
+                    if self.__is_triggered_by(rule, reading.timestamp):
+                        continue
 
-                rule.last_triggered_by = datetime.fromtimestamp(earthquake.timestamp)
+                    triggered.append(rule)
+                    rule.last_triggered_by = datetime.fromtimestamp(reading.timestamp)
+                    self.session.add(rule)
 
-            self.session.add(rule)
+        for cursor, timestamp in self.__pending_cursors:
+            cursor.timestamp = max(cursor.timestamp, timestamp)
+            self.session.add(cursor)
+        self.__pending_cursors.clear()
 
-        self.session.commit()
+        self.__create_issues_and_send_emails(triggered)
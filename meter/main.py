@@ -9,18 +9,23 @@ from meter.api import (
     comment,
     get_config,
     get_current_user,
+    get_engine,
     group,
     issue,
+    metrics,
     report,
     rule,
+    site,
     upload,
     user,
 )
 from meter.api.cors import set_cors
-from meter.domain import create_db_and_tables, get_engine
+from meter.constant.template_path import FOLDER as TEMPLATE_FOLDER
+from meter.domain import create_db_and_tables
+from meter.domain.smtp import close_pools
 from meter.domain.user import User
 from meter.exception import CustomErrorException
-from meter.helper import get_message_by_response_code
+from meter.helper import TEMPLATES, get_message_by_response_code
 
 
 def create_app():
@@ -43,7 +48,13 @@ def create_app():
     @app.on_event("startup")
     def on_startup():
         cfg = get_config()
-        create_db_and_tables(get_engine(cfg.sql))
+        create_db_and_tables(get_engine(cfg))
+        TEMPLATES.load_folder(TEMPLATE_FOLDER)
+
+    @app.on_event("shutdown")
+    def on_shutdown():
+        # send the queued emails before exit
+        close_pools()
 
     @app.exception_handler(IntegrityError)
     async def non_unique_exception_handler(request: Request, exc: IntegrityError):
@@ -75,6 +86,8 @@ def create_app():
         ("/user", user),
         ("/group", group),
         ("/report", report),
+        ("/site", site),
+        ("/metrics", metrics),
     )
 
     for prefix, api in apis:
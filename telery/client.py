@@ -0,0 +1,15 @@
+from celery.signals import worker_process_shutdown
+
+from crawler import client
+from crawler.client import HTTPConfig
+
+from . import app
+
+# Every task of a worker process shares one HTTP client and its connections.
+# It is created on first use, so nothing is inherited across `fork()`.
+client.configure(HTTPConfig(**app.conf.get("crawler_http", {})))
+
+
+@worker_process_shutdown.connect
+def on_worker_process_shutdown(**kwargs):
+    client.close()
@@ -1,66 +1,66 @@
-import asyncio
 import time
+from datetime import date
 
-from sqlmodel import create_engine
-
+from crawler.backfill import backfill_range
+from crawler.cache import SQLCache
 from crawler.crawler.dam import DamCrawler
 from crawler.crawler.eq import EqCrawler
 from crawler.crawler.power import PowerCrawler
-from crawler.model import Dam, Eq, Power, save_crawler_report
+from crawler.model import Dam, Eq, Power
+from crawler.pipeline import run_pipeline
 from telery import app
 
-from .dbconfig import db_url
+from . import client  # noqa: F401, shares the HTTP client of the process
+from .db import get_engine
 
 
 @app.task
 def crawl_earthquake(year: int, month: int):
     eq = EqCrawler([{"year": year, "month": month}])
-    asyncio.run(eq.crawl())
-    report = list(eq.report())
-    engine = create_engine(db_url)
-    save_crawler_report(engine, Eq, report)
-    return len(report)
+    return run_pipeline(get_engine(), eq, Eq)
 
 
 @app.task
 def crawl_reservoir(year: int, month: int, day: int):
     dam = DamCrawler([{"year": year, "month": month, "day": day}])
-    asyncio.run(dam.crawl())
-    report = list(dam.report())
-    engine = create_engine(db_url)
-    save_crawler_report(engine, Dam, report)
-    return len(report)
+    return run_pipeline(get_engine(), dam, Dam)
 
 
 @app.task
 def crawl_power():
-    power = PowerCrawler()
-    asyncio.run(power.crawl())
-    report = list(power.report())
-    engine = create_engine(db_url)
-    save_crawler_report(engine, Power, report)
-    return len(report)
+    engine = get_engine()
+    power = PowerCrawler(
+        cache=SQLCache(engine),
+        supply_ttl=app.conf.get("power_supply_ttl", 3600),
+    )
+    return run_pipeline(engine, power, Power)
 
 
 @app.task
 def crawl_now_earthquake():
+    engine = get_engine()
     now_time = time.localtime()
-    eq = EqCrawler([{"year": now_time.tm_year, "month": now_time.tm_mon}])
-    asyncio.run(eq.crawl())
-    report = list(eq.report())
-    engine = create_engine(db_url)
-    save_crawler_report(engine, Eq, report)
-    return len(report)
+    eq = EqCrawler(
+        [{"year": now_time.tm_year, "month": now_time.tm_mon}],
+        cache=SQLCache(engine),
+    )
+    return run_pipeline(engine, eq, Eq)
 
 
 @app.task
 def crawl_now_reservoir():
+    engine = get_engine()
     now_time = time.localtime()
     dam = DamCrawler(
-        [{"year": now_time.tm_year, "month": now_time.tm_mon, "day": now_time.tm_mday}]
+        [{"year": now_time.tm_year, "month": now_time.tm_mon, "day": now_time.tm_mday}],
+        cache=SQLCache(engine),
+    )
+    return run_pipeline(engine, dam, Dam)
+
+
+@app.task
+def backfill(report: str, since: str, until: str):
+    """Crawl the history of `report` ("eq" or "dam") between ISO dates."""
+    return backfill_range(
+        get_engine(), report, date.fromisoformat(since), date.fromisoformat(until)
     )
-    asyncio.run(dam.crawl())
-    report = list(dam.report())
-    engine = create_engine(db_url)
-    save_crawler_report(engine, Dam, report)
-    return len(report)
@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from celery.signals import worker_process_init, worker_process_shutdown
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, create_engine
+
+from . import dbconfig
+
+# One engine (and its connection pool) per worker process. Engines must not be
+# shared across `fork()`, so it is created after the pool process started.
+_engine: Engine | None = None
+
+
+def _engine_args() -> dict:
+    if dbconfig.db_url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": getattr(dbconfig, "pool_size", 5),
+        "max_overflow": getattr(dbconfig, "max_overflow", 10),
+        "pool_recycle": getattr(dbconfig, "pool_recycle", 1800),
+        "pool_pre_ping": True,
+    }
+
+
+def init_engine() -> Engine:
+    global _engine
+    if _engine is not None:
+        _engine.dispose()
+    _engine = create_engine(dbconfig.db_url, **_engine_args())
+    return _engine
+
+
+def dispose_engine() -> None:
+    global _engine
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+
+
+def get_engine() -> Engine:
+    # fallback for processes which do not emit `worker_process_init`,
+    # e.g. the solo / threads pool or calling tasks directly
+    if _engine is None:
+        return init_engine()
+    return _engine
+
+
+@contextmanager
+def get_session() -> Iterator[Session]:
+    with Session(get_engine()) as session:
+        yield session
+
+
+@worker_process_init.connect
+def on_worker_process_init(**kwargs):
+    init_engine()
+
+
+@worker_process_shutdown.connect
+def on_worker_process_shutdown(**kwargs):
+    dispose_engine()
@@ -1,22 +1,33 @@
-from sqlmodel import Session, create_engine
+import logging
+
+from celery.signals import worker_process_shutdown
 
 from meter.api import MeterConfig
 from meter.domain.issue import IssueService
-from meter.domain.smtp import EmailService
+from meter.domain.smtp import EmailService, close_pools, pool_metrics
 from meter.job.trigger_rule import TriggerRuleJob
 from telery import app
 
-from .dbconfig import db_url
+from .db import get_session
 
 
 @app.task
 def watch_new_data():
-    engine = create_engine(db_url)
-    session = Session(engine)
     smtp = MeterConfig().smtp
     email_svc = EmailService(smtp)
-    issue_svc = IssueService(session)
 
-    job = TriggerRuleJob(session, email_svc, issue_svc)
-    job.trigger_over_threshold()
+    with get_session() as session:
+        issue_svc = IssueService(session)
+        job = TriggerRuleJob(session, email_svc, issue_svc)
+        job.trigger_over_threshold()
+
+    # the pools live in the worker process, out of reach of `GET /metrics`
+    for metrics in pool_metrics():
+        logging.info(f"[smtp] metrics: {metrics.json()}")
     return "ok"
+
+
+@worker_process_shutdown.connect
+def on_worker_process_shutdown(**kwargs):
+    # the emails are sent by the SMTP pool of the process, after the task returns
+    close_pools()
@@ -0,0 +1,26 @@
+import asyncio
+
+from sqlalchemy import text
+
+from meter.api import get_async_engine, reload_config
+from tests.conftest import get_test_config
+
+
+def test_reload_config_disposes_async_engines(test_sql_param):
+    cfg = get_test_config()
+    cfg.sql = test_sql_param
+
+    async def reload():
+        engine = get_async_engine(cfg)
+        assert get_async_engine(cfg) is engine
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        pool = engine.sync_engine.pool
+
+        await reload_config()
+        # the pool is disposed, and a new engine is built
+        assert engine.sync_engine.pool is not pool
+        assert get_async_engine(cfg) is not engine
+        await reload_config()
+
+    asyncio.run(reload())
@@ -0,0 +1,31 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from meter.domain.smtp import EmailService, close_pools, get_pool
+from tests.conftest import get_test_config
+
+
+def test_get_smtp_metrics(test_client: TestClient):
+    # no workers, so the emails stay in the queue
+    config = get_test_config().smtp.copy(update={"workers": 0})
+    pool = get_pool(config, "a@b.c", None)
+    for _ in range(3):
+        pool.submit(EmailService.message("a@b.c", ["d@e.f"], "Hi", "text", "html"))
+
+    res = test_client.get("/metrics")
+    close_pools()
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res.json()["smtp"] == [
+        {
+            "server": config.server,
+            "port": config.port,
+            "from_addr": "a@b.c",
+            "queued": 3,
+            "sending": 0,
+            "sent": 0,
+            "retried": 0,
+            "failed": 0,
+            "connections": 0,
+        }
+    ]
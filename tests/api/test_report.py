@@ -1,3 +1,5 @@
+import csv
+import io
 import json
 
 import pytest
@@ -5,17 +7,25 @@ from fastapi import status
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 
-from crawler.model import Dam, Eq, Power
+from crawler.model import (
+    Dam,
+    DamReport,
+    Eq,
+    EqReport,
+    Power,
+    PowerReport,
+    save_crawler_report,
+)
 
 
 class TestReportClass:
     @pytest.fixture(autouse=True)
     def setup_method(self, test_session: Session) -> None:
-        for c in (Power, Eq, Dam):
+        for c, report_model in ((Power, PowerReport), (Eq, EqReport), (Dam, DamReport)):
             report = json.load(open(f"crawler/example/{c.__name__.lower()}.json"))
-            for r in report:
-                test_session.add(c(**r))
-                test_session.commit()
+            save_crawler_report(
+                test_session.get_bind(), c, [report_model(**r) for r in report]
+            )
 
     def test_get_power(self, test_client: TestClient):
         resp = test_client.get("/report/power")
@@ -41,3 +51,80 @@ class TestReportClass:
         resp = test_client.get("/report/dam")
         assert resp.status_code == status.HTTP_200_OK, resp.json()
         assert any(filter(lambda d: d["name"] == "竹", resp.json())), resp.json()
+
+    def test_get_eq_paginated(self, test_client: TestClient):
+        example = json.load(open("crawler/example/eq.json"))
+        timestamps = []
+        params = {"limit": 5}
+        while True:
+            resp = test_client.get("/report/eq", params=params)
+            assert resp.status_code == status.HTTP_200_OK, resp.json()
+            assert len(resp.json()) <= 5
+            timestamps += [e["timestamp"] for e in resp.json()]
+            if "x-next-cursor" not in resp.headers:
+                break
+            params["after"] = resp.headers["x-next-cursor"]
+
+        assert timestamps == sorted(e["timestamp"] for e in example)
+
+    def test_get_eq_time_range(self, test_client: TestClient):
+        example = json.load(open("crawler/example/eq.json"))
+        since, until = sorted(e["timestamp"] for e in example)[5:7]
+
+        resp = test_client.get("/report/eq", params={"since": since, "until": until})
+        assert resp.status_code == status.HTTP_200_OK, resp.json()
+        assert [e["timestamp"] for e in resp.json()] == [since]
+
+    def test_get_eq_invalid_cursor(self, test_client: TestClient):
+        resp = test_client.get("/report/eq", params={"after": "foo"})
+        assert resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY, resp.json()
+
+    def test_get_dam_time_range(self, test_client: TestClient):
+        regions = {"竹", "中", "南"}
+        resp = test_client.get("/report/dam")
+        (latest,) = {d["timestamp"] for d in resp.json() if d["name"] in regions}
+
+        # a window before the latest summaries has none of them
+        resp = test_client.get("/report/dam", params={"until": latest})
+        assert resp.status_code == status.HTTP_200_OK, resp.json()
+        assert len(resp.json()) > 0
+        assert not any(d["name"] in regions for d in resp.json()), resp.json()
+
+        resp = test_client.get(
+            "/report/dam", params={"since": latest, "until": latest + 1}
+        )
+        assert resp.status_code == status.HTTP_200_OK, resp.json()
+        assert {d["name"] for d in resp.json()} >= regions, resp.json()
+
+    def test_get_dam_by_name(self, test_client: TestClient):
+        resp = test_client.get("/report/dam", params={"name": "石門水庫"})
+        assert resp.status_code == status.HTTP_200_OK, resp.json()
+        assert len(resp.json()) > 0
+        assert all(d["name"] == "石門水庫" for d in resp.json()), resp.json()
+
+    def test_export_eq_ndjson(self, test_client: TestClient):
+        example = json.load(open("crawler/example/eq.json"))
+
+        resp = test_client.get("/report/eq/export")
+        assert resp.status_code == status.HTTP_200_OK
+        assert resp.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in resp.text.splitlines()]
+        assert [r["timestamp"] for r in rows] == sorted(e["timestamp"] for e in example)
+        first = min(example, key=lambda e: e["timestamp"])
+        assert (rows[0]["lon"], rows[0]["lat"]) == tuple(
+            first["geometry"]["coordinates"]
+        )
+        assert rows[0]["intensity_hsinchu"] == first["intensity"][0]
+
+    def test_export_dam_csv(self, test_client: TestClient):
+        example = json.load(open("crawler/example/dam.json"))
+        since = min(d["timestamp"] for d in example) + 1
+
+        resp = test_client.get(
+            "/report/dam/export", params={"format": "csv", "since": since}
+        )
+        assert resp.status_code == status.HTTP_200_OK
+        assert resp.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(resp.text)))
+        assert len(rows) == len([d for d in example if d["timestamp"] >= since])
+        assert all(int(r["timestamp"]) >= since for r in rows)
@@ -0,0 +1,90 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from crawler.intensity import SITES, intensity_matrix
+from crawler.model import Eq, EqReport, save_crawler_report
+from meter.domain.user import UserSignup
+from tests.helper import get_authorization_header
+
+SITE = {"name": "KAOHSIUNG", "lon": 120.3, "lat": 22.6, "factor": 1.5}
+
+
+class TestSiteClass:
+    def get_header(self, test_client: TestClient):
+        user = UserSignup(name="foo", email="foo@foo.com", password="foo")
+        return get_authorization_header(test_client, user)
+
+    def test_get_default_sites(self, test_client: TestClient):
+        res = test_client.get("/site")
+
+        assert res.status_code == status.HTTP_200_OK
+        assert sorted(s["name"] for s in res.json()) == sorted(SITES)
+
+    def test_create_site_unauthorized(self, test_client: TestClient):
+        res = test_client.post("/site", json=SITE)
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_create_site(self, test_client: TestClient, test_session: Session):
+        report = EqReport(
+            timestamp=1690000000,
+            geometry={"type": "Point", "coordinates": (120.5, 23.0)},
+            scale=6.0,
+            depth=10.0,
+            intensity=(0, 0, 0),
+            link="",
+            img="",
+        )
+        save_crawler_report(test_session.get_bind(), Eq, [report])
+
+        res = test_client.post("/site", json=SITE, headers=self.get_header(test_client))
+        assert res.status_code == status.HTTP_201_CREATED
+        assert res.json() == SITE
+
+        # the history is estimated for the new site
+        (expected,) = intensity_matrix(
+            [6.0], [10.0], [120.5], [23.0], [(SITE["lon"], SITE["lat"], SITE["factor"])]
+        )
+        (eq,) = test_client.get("/report/eq").json()
+        assert eq["site_intensity"]["KAOHSIUNG"] == expected[0]
+
+        # and again when the site is changed
+        header = self.get_header(test_client)
+        res = test_client.patch(
+            "/site/KAOHSIUNG", json={"factor": 0.01}, headers=header
+        )
+        assert res.status_code == status.HTTP_200_OK
+        (eq,) = test_client.get("/report/eq").json()
+        assert eq["site_intensity"]["KAOHSIUNG"] == 0
+
+    def test_delete_site(self, test_client: TestClient):
+        header = self.get_header(test_client)
+        test_client.post("/site", json=SITE, headers=header)
+
+        res = test_client.delete("/site/KAOHSIUNG", headers=header)
+        assert res.status_code == status.HTTP_204_NO_CONTENT
+
+        res = test_client.get("/site/KAOHSIUNG")
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_delete_default_site(self, test_client: TestClient):
+        header = self.get_header(test_client)
+
+        res = test_client.delete("/site/HSINCHU", headers=header)
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_update_default_site(self, test_client: TestClient):
+        header = self.get_header(test_client)
+
+        res = test_client.patch("/site/HSINCHU", json={"factor": 2}, headers=header)
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_change_site_forbidden(self, test_client: TestClient):
+        user = UserSignup(name="bar", email="bar@bar.com", password="bar")
+        header = get_authorization_header(test_client, user)
+
+        res = test_client.post("/site", json=SITE, headers=header)
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+        res = test_client.delete("/site/TAINAN", headers=header)
+        assert res.status_code == status.HTTP_403_FORBIDDEN
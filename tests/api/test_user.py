@@ -1,8 +1,13 @@
+from queue import Full
+
 from fastapi import status
 from fastapi.testclient import TestClient
 
+from meter.api import get_email_service
 from meter.constant.response_code import ResponseCode
-from meter.domain.user import UserSignup
+from meter.domain.smtp import EmailService
+from meter.domain.user import UserService, UserSignup
+from tests.conftest import get_test_config
 from tests.helper import get_authorization_header
 
 
@@ -203,6 +208,23 @@ def test_send_email_and_active(test_client: TestClient):
     assert resp.json()["active"] == True, resp.json()
 
 
+def test_send_email_queue_full(test_app, test_client: TestClient):
+    class FullEmailService(EmailService):
+        def send(self, *args, block=True, **kargs):
+            assert not block
+            raise Full
+
+    test_app.dependency_overrides[get_email_service] = lambda: FullEmailService(
+        get_test_config().smtp
+    )
+    user = UserSignup(name="foo", email="foo@google.com", password="foo")
+    headers = get_authorization_header(test_client, user)
+
+    resp = test_client.post("/auth/send_email", headers=headers)
+    assert resp.status_code == status.HTTP_503_SERVICE_UNAVAILABLE, resp.json()
+    assert resp.json()["code"] == ResponseCode.AUTH_SEND_EMAIL_FAILED_1202.value
+
+
 def test_login_failed(test_client: TestClient):
     user = UserSignup(
         name="foo",
@@ -223,3 +245,25 @@ def test_login_failed(test_client: TestClient):
     assert (
         resp.json()["code"] == ResponseCode.AUTH_WRONG_USERNAME_OR_PASSWORD_1201.value
     )
+
+
+def test_current_user_cached(test_client: TestClient, monkeypatch):
+    user = UserSignup(
+        name="foo",
+        email="foo@google.com",
+        password="foo",
+    )
+    headers = get_authorization_header(test_client, user)
+    resp = test_client.get("/me", headers=headers)
+    assert resp.status_code == status.HTTP_200_OK, resp.json()
+
+    def get_by_name(*args):
+        raise AssertionError("should be cached")
+
+    monkeypatch.setattr(UserService, "_get_by_name", get_by_name)
+    for _ in range(3):
+        resp = test_client.get("/me", headers=headers)
+        assert resp.json()["name"] == "foo", resp.json()
+
+    resp = test_client.get("/me", headers={"Authorization": "Bearer lalala"})
+    assert resp.status_code == status.HTTP_401_UNAUTHORIZED, resp.json()
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from pathlib import Path
 
@@ -7,7 +8,14 @@ from fastapi.testclient import TestClient
 from sqlmodel import Session, create_engine
 from sqlmodel.pool import StaticPool
 
-from meter.api import get_config, get_email_service, get_session
+from meter.api import (
+    get_async_engine,
+    get_config,
+    get_email_service,
+    get_engine,
+    get_session,
+    reload_config,
+)
 from meter.config import MeterConfig
 from meter.domain import (
     SMTPServerParam,
@@ -15,8 +23,10 @@ from meter.domain import (
     VerifyEmailParam,
     create_db_and_tables,
 )
+from meter.domain import get_async_engine as _get_async_engine
 from meter.domain.auth import AuthConfig
 from meter.domain.smtp import EmailService
+from meter.domain.user import USER_CACHE
 from meter.main import create_app
 
 
@@ -39,6 +49,9 @@ def get_test_config():
             secret_key="i-am-example-secret-key",
             algorithm="HS256",
             default_ttl_sec=900,
+            # the lowest cost, to keep the tests fast
+            bcrypt_rounds=4,
+            admins=["foo"],
         ),
         verify_email=VerifyEmailParam(
             subject="Hi",
@@ -55,14 +68,29 @@ def get_test_config():
     )
 
 
+# the API uses an async engine, so the sync and async engines of a test
+# share a SQLite file instead of an in-memory database
+@pytest.fixture
+def test_sql_param(tmp_path: Path):
+    return SQLEngineParam(
+        url=f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False},
+    )
+
+
 @pytest.fixture
-def test_session():
-    engine = get_in_memory_engine()
+def test_session(test_sql_param: SQLEngineParam):
+    engine = create_engine(**test_sql_param.dict())
     create_db_and_tables(engine)
     with Session(engine) as session:
         yield session
 
 
+@pytest.fixture
+def test_async_engine(test_sql_param: SQLEngineParam):
+    return _get_async_engine(test_sql_param)
+
+
 def get_email_service_override():
     class NewEmailService(EmailService):
         def __init__(self, *args, **kargs) -> None:
@@ -75,22 +103,34 @@ def get_email_service_override():
 
 
 @pytest.fixture
-def test_app(tmp_path: Path, test_session: Session):
+def test_app(tmp_path: Path, test_session: Session, test_async_engine):
     def get_test_session():
         return test_session
 
+    def get_test_engine():
+        return test_session.get_bind()
+
+    def get_test_async_engine():
+        return test_async_engine
+
     tmp_config_path = tmp_path / "meter.toml"
     toml.dump(get_test_config().dict(), tmp_config_path.open("w"))
     os.environ["METER_CONFIG"] = str(tmp_config_path.absolute())
+    asyncio.run(reload_config())
 
     app = create_app()
     app.dependency_overrides[get_config] = get_test_config
+    app.dependency_overrides[get_engine] = get_test_engine
     app.dependency_overrides[get_session] = get_test_session
+    app.dependency_overrides[get_async_engine] = get_test_async_engine
     app.dependency_overrides[get_email_service] = get_email_service_override
     yield app
     app.dependency_overrides.clear()
+    # users of each test are in their own database
+    USER_CACHE.clear()
 
     del os.environ["METER_CONFIG"]
+    asyncio.run(reload_config())
 
 
 @pytest.fixture
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+from crawler import client
+from crawler.client import HTTPConfig
+
+
+async def current_client():
+    return client.get_client()
+
+
+def test_client_shared_across_runs():
+    first = client.run(current_client())
+    second = client.run(current_client())
+
+    assert first is second
+    assert not first.is_closed
+
+
+def test_run_off_the_caller_thread():
+    async def thread():
+        return threading.current_thread()
+
+    assert client.run(thread()) is not threading.current_thread()
+
+
+def test_client_per_loop():
+    shared = client.run(current_client())
+
+    assert asyncio.run(current_client()) is not shared
+
+
+def test_configure():
+    old = client.run(current_client())
+    client.configure(HTTPConfig(max_connections=3, timeout=5))
+    new = client.run(current_client())
+
+    assert old.is_closed
+    assert new is not old
+    assert new.timeout.read == 5
+    client.configure(HTTPConfig())
+
+
+def test_close():
+    shared = client.run(current_client())
+    client.close()
+
+    assert shared.is_closed
+    assert client.run(current_client()) is not shared
@@ -0,0 +1,203 @@
+import asyncio
+from collections import Counter
+from datetime import date
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+from sqlmodel import Session, select
+
+from crawler.cache import MemoryCache
+from crawler.crawler import dam, eq
+from crawler.crawler.crawler import Crawler, CrawlLimits
+from crawler.model import Dam, DamReport
+from crawler.pipeline import run_pipeline
+from meter.domain import create_db_and_tables
+from tests.conftest import get_in_memory_engine
+
+LIMITS = CrawlLimits(concurrency=3, rate=1000, retries=2, backoff=0)
+
+
+class MockCrawler(Crawler[DamReport, int], method="get"):
+    def __init__(self, queries, handler, limits=LIMITS, cache=None):
+        super().__init__(queries, limits, cache)
+        self.handler = handler
+
+    def _client(self):
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+    def _url(self, query: int):
+        return f"https://example.com/{query}"
+
+    def _data(self, query: int):
+        return b""
+
+    def _report(self, data: bytes):
+        yield DamReport(name="石門水庫", timestamp=int(data), storage=1, percent=1)
+
+
+def run(crawler: MockCrawler):
+    async def collect():
+        return [r async for report in crawler.stream() for r in report]
+
+    return asyncio.run(collect())
+
+
+def test_stream_bounded_concurrency():
+    in_flight = 0
+    max_in_flight = 0
+
+    async def handler(request: httpx.Request):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, content=request.url.path[1:].encode())
+
+    reports = run(MockCrawler(range(20), handler))
+
+    assert sorted(r.timestamp for r in reports) == list(range(20))
+    assert max_in_flight == LIMITS.concurrency
+
+
+def test_stream_retry():
+    attempts = Counter()
+
+    def handler(request: httpx.Request):
+        attempts[request.url.path] += 1
+        if request.url.path == "/1" and attempts["/1"] <= 2:
+            return httpx.Response(503)
+        if request.url.path == "/2":
+            return httpx.Response(404)
+        if request.url.path == "/3":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, content=request.url.path[1:].encode())
+
+    reports = run(MockCrawler(range(4), handler))
+
+    # 404 is not retried, the others give up after `retries`
+    assert sorted(r.timestamp for r in reports) == [0, 1]
+    assert attempts == {"/0": 1, "/1": 3, "/2": 1, "/3": 3}
+
+
+def test_stream_rate_limit():
+    limits = CrawlLimits(concurrency=10, rate=50, retries=0)
+    times = []
+
+    def handler(request: httpx.Request):
+        times.append(asyncio.get_running_loop().time())
+        return httpx.Response(200, content=b"0")
+
+    run(MockCrawler(range(5), handler, limits))
+
+    assert max(times) - min(times) >= (len(times) - 1) / limits.rate * 0.9
+
+
+def test_stream_batches():
+    def handler(request: httpx.Request):
+        return httpx.Response(200, content=request.url.path[1:].encode())
+
+    class ManyCrawler(MockCrawler, method="get"):
+        def _report(self, data: bytes):
+            for _ in range(int(data)):
+                yield from super()._report(data)
+
+    async def collect():
+        return [batch async for batch in ManyCrawler([5], handler).stream(2)]
+
+    assert [len(batch) for batch in asyncio.run(collect())] == [2, 2, 1]
+
+
+def test_run_pipeline():
+    engine = get_in_memory_engine()
+    create_db_and_tables(engine)
+
+    def handler(request: httpx.Request):
+        return httpx.Response(200, content=request.url.path[1:].encode())
+
+    result = run_pipeline(engine, MockCrawler([1, 2, 2, 3], handler), Dam)
+
+    assert result == {"inserted": 3, "updated": 0, "skipped": 1}
+    with Session(engine) as session:
+        assert len(session.exec(select(Dam)).all()) == 3
+
+
+def test_stream_conditional():
+    cache = MemoryCache()
+    bodies = {"/1": b"1", "/2": b"2"}
+    conditions = []
+
+    def handler(request: httpx.Request):
+        conditions.append(request.headers.get("If-None-Match"))
+        body = bodies[request.url.path]
+        if request.url.path == "/1":
+            etag = f'"{body.decode()}"'
+            if request.headers.get("If-None-Match") == etag:
+                return httpx.Response(304)
+            return httpx.Response(200, content=body, headers={"ETag": etag})
+        return httpx.Response(200, content=body)
+
+    def crawl():
+        return sorted(
+            r.timestamp for r in run(MockCrawler([1, 2], handler, cache=cache))
+        )
+
+    assert crawl() == [1, 2]
+    # not modified, or the same body
+    assert crawl() == []
+    assert Counter(conditions) == {None: 3, '"1"': 1}
+
+    bodies["/2"] = b"3"
+    assert crawl() == [3]
+
+
+def test_stream_conditional_after_save():
+    cache = MemoryCache()
+
+    def handler(request: httpx.Request):
+        return httpx.Response(200, content=b"1")
+
+    async def fail_to_save():
+        async for _ in MockCrawler([1], handler, cache=cache).stream():
+            raise RuntimeError()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(fail_to_save())
+    # crawled again since it was not saved
+    assert len(run(MockCrawler([1], handler, cache=cache))) == 1
+
+
+@pytest.mark.parametrize(
+    "queries, since, until, expected",
+    [
+        (eq.queries, date(1995, 11, 15), date(1996, 2, 1), 4),
+        (dam.queries, date(2023, 2, 27), date(2023, 3, 2), 4),
+    ],
+)
+def test_queries(queries, since, until, expected):
+    assert len(list(queries(since, until))) == expected
+
+
+def test_eq_pages():
+    # 120 earthquakes in the month, a second apart
+    rows = [
+        [f"2023050{i:04}", "1", f"2023-05-01 00:{i // 60:02}:{i % 60:02}"]
+        + ["4.0", "10.0", "", "", "121.0", "24.0"]
+        for i in range(120)
+    ]
+    starts = []
+
+    def handler(request: httpx.Request):
+        form = parse_qs(request.content.decode())
+        start, length = int(form["start"][0]), int(form["length"][0])
+        starts.append(start)
+        page = rows[start : start + length]
+        return httpx.Response(200, json={"recordsFiltered": 120, "data": page})
+
+    crawler = eq.EqCrawler([{"year": 2023, "month": 5}], LIMITS)
+    crawler._client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    reports = run(crawler)
+
+    assert sorted(starts) == [0, 50, 100]
+    assert len({r.timestamp for r in reports}) == 120
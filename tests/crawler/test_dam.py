@@ -0,0 +1,86 @@
+import asyncio
+from collections import Counter
+from urllib.parse import parse_qs
+
+import httpx
+
+from crawler.cache import MemoryCache
+from crawler.crawler.crawler import CrawlLimits
+from crawler.crawler.dam import DamCrawler
+
+PAGE = "".join(
+    f'<input type="hidden" name="{k}" id="{k}" value="{k.lower()}" />'
+    for k in ("__VIEWSTATE", "__VIEWSTATEGENERATOR", "__EVENTVALIDATION")
+)
+
+
+def row(day: str):
+    cells = ['1">石門水庫</a>', f">{day} 00:00:00", ">", ">", ">", ">", ">1,234.5"]
+    return '<a href="ReservoirChart.aspx?key=' + "</td><td".join(cells + [">36.88 %"])
+
+
+def crawl(handler, days=5, cache=None):
+    dam = DamCrawler(
+        [{"year": 2023, "month": 5, "day": d} for d in range(1, days + 1)],
+        CrawlLimits(rate=1000, backoff=0),
+        cache,
+    )
+    dam._client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def collect():
+        return [r async for batch in dam.stream() for r in batch]
+
+    return asyncio.run(collect())
+
+
+def test_form_tokens_reused():
+    requests = Counter()
+
+    def handler(request: httpx.Request):
+        requests[request.method] += 1
+        if request.method == "GET":
+            return httpx.Response(200, text=PAGE)
+
+        form = parse_qs(request.content.decode())
+        assert form["__VIEWSTATE"] == ["__viewstate"]
+        day = form["ctl00$cphMain$ucDate$cboDay"][0]
+        return httpx.Response(200, text=row(f"2023-05-{int(day):02}"))
+
+    reports = crawl(handler)
+
+    assert len(reports) == 5
+    assert reports[0].storage == 1234.5
+    assert requests == {"GET": 1, "POST": 5}
+
+
+def test_form_tokens_refreshed_on_failure():
+    requests = Counter()
+
+    def handler(request: httpx.Request):
+        requests[request.method] += 1
+        if request.method == "GET":
+            return httpx.Response(200, text=PAGE)
+        # the first postback is rejected
+        if requests["POST"] == 1:
+            return httpx.Response(500)
+        return httpx.Response(200, text=row("2023-05-01"))
+
+    reports = crawl(handler, days=1)
+
+    assert len(reports) == 1
+    assert requests == {"GET": 2, "POST": 2}
+
+
+def test_unchanged_rows_skipped():
+    cache = MemoryCache()
+    tokens = iter(range(100))
+
+    def handler(request: httpx.Request):
+        if request.method == "GET":
+            return httpx.Response(200, text=PAGE)
+        # new form tokens on every response, before the same rows
+        hidden = f'<input id="__VIEWSTATE" value="{next(tokens)}" />'
+        return httpx.Response(200, text=hidden + row("2023-05-01"))
+
+    assert len(crawl(handler, days=1, cache=cache)) == 1
+    assert crawl(handler, days=1, cache=cache) == []
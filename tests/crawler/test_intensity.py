@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from crawler.intensity import (
+    SITES,
+    geodist,
+    geodist_matrix,
+    intensity,
+    intensity_matrix,
+)
+
+
+@pytest.fixture
+def earthquakes():
+    random.seed(0)
+    return [
+        (
+            round(random.uniform(2, 8), 1),
+            round(random.uniform(1, 300), 1),
+            round(random.uniform(119, 123), 4),
+            round(random.uniform(21, 26), 4),
+        )
+        for _ in range(1000)
+    ]
+
+
+def test_geodist_matrix(earthquakes):
+    _, _, lon, lat = zip(*earthquakes)
+    site_lon, site_lat, _ = zip(*SITES.values())
+
+    dist = geodist_matrix(lon, lat, site_lon, site_lat)
+
+    assert dist.shape == (len(earthquakes), len(SITES))
+    for i, (lo, la) in enumerate(zip(lon, lat)):
+        for j, site in enumerate(SITES.values()):
+            assert dist[i, j] == pytest.approx(geodist((lo, la), site[:2]))
+
+
+def test_intensity_matrix(earthquakes):
+    inten = intensity_matrix(*zip(*earthquakes))
+
+    assert inten.shape == (len(earthquakes), len(SITES))
+    assert [tuple(i) for i in inten] == [
+        intensity(scale, depth, (lon, lat)) for scale, depth, lon, lat in earthquakes
+    ]
+    # strong and near ones are covered as well
+    assert inten.max() >= 5
+
+
+def test_intensity_matrix_of_sites():
+    sites = [(121.5, 25.0, 1.0)] * 2 + list(SITES.values())
+
+    inten = intensity_matrix([6.5], [10], [121.0], [24.0], sites)
+
+    assert inten.shape == (1, 5)
+    assert tuple(inten[0, 2:]) == intensity(6.5, 10, (121.0, 24.0))
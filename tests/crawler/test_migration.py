@@ -0,0 +1,133 @@
+import json
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlmodel import Session, select
+
+from crawler.intensity import SITES
+from crawler.model import Dam, DamRegion, Eq, EqReport, save_crawler_report
+from crawler.model.migration import migrate
+from meter.domain import create_db_and_tables
+from meter.domain.report import ReportPage, ReportService
+from tests.conftest import get_in_memory_engine
+
+
+@pytest.mark.parametrize("with_whole", [False, True])
+def test_split_power_regions(with_whole):
+    engine = get_in_memory_engine()
+    example = json.load(open("crawler/example/power.json"))[0]
+    regions = ["east", "south", "central", "north"] + (["whole"] if with_whole else [])
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE power (id INTEGER PRIMARY KEY, timestamp INTEGER, "
+                + ", ".join(f"{k} JSON" for k in regions)
+                + ")"
+            )
+        )
+        conn.execute(
+            text(
+                f"INSERT INTO power (timestamp, {', '.join(regions)})"
+                f" VALUES (:timestamp, {', '.join(':' + k for k in regions)})"
+            ),
+            {"timestamp": example["timestamp"]}
+            | {k: json.dumps(example[k]) for k in regions},
+        )
+
+    create_db_and_tables(engine)
+    migrate(engine)
+
+    assert not inspect(engine).has_table("power")
+    with Session(engine) as session:
+        (power,) = ReportService(session).get_all_power()
+        assert power.timestamp == example["timestamp"]
+        for k in ("east", "south", "central", "north", "whole"):
+            assert power.dict()[k] == example[k]
+
+
+LEGACY_EQ_SCHEMAS = {
+    # `Eq.geometry` and `Eq.intensity` in JSON
+    "json": (
+        "geometry JSON, intensity JSON",
+        lambda e: {k: json.dumps(e[k]) for k in ("geometry", "intensity")},
+    ),
+    # epicentre and intensities of the default sites in columns
+    "columns": (
+        "lon FLOAT, lat FLOAT, intensity_hsinchu INTEGER,"
+        " intensity_taichung INTEGER, intensity_tainan INTEGER",
+        lambda e: dict(
+            zip(("lon", "lat"), e["geometry"]["coordinates"]),
+            **dict(
+                zip(
+                    ("intensity_hsinchu", "intensity_taichung", "intensity_tainan"),
+                    e["intensity"],
+                )
+            ),
+        ),
+    ),
+}
+
+
+@pytest.mark.parametrize("schema", LEGACY_EQ_SCHEMAS.keys())
+def test_rebuild_eq_table(schema):
+    columns, to_row = LEGACY_EQ_SCHEMAS[schema]
+    engine = get_in_memory_engine()
+    example = json.load(open("crawler/example/eq.json"))
+    rows = [
+        {k: e[k] for k in ("timestamp", "scale", "link", "img")} | to_row(e)
+        for e in example
+    ]
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE eq (id INTEGER PRIMARY KEY, timestamp INTEGER,"
+                f" scale FLOAT, link VARCHAR, img VARCHAR, {columns})"
+            )
+        )
+        conn.execute(
+            text(
+                f"INSERT INTO eq ({', '.join(rows[0])})"
+                f" VALUES ({', '.join(':' + k for k in rows[0])})"
+            ),
+            rows,
+        )
+
+    create_db_and_tables(engine)
+    migrate(engine)
+
+    with Session(engine) as session:
+        eqs = ReportService(session).get_all_eq(ReportPage(limit=len(example)))
+        assert [e.dict(exclude={"id", "site_intensity"}) for e in eqs] == sorted(
+            (EqReport(**e).dict() for e in example), key=lambda e: e["timestamp"]
+        )
+        assert set(eqs[0].site_intensity.keys()) == set(SITES)
+
+    # new rows get ids after the copied ones
+    latest = max(example, key=lambda e: e["timestamp"])
+    report = EqReport(**(latest | {"timestamp": latest["timestamp"] + 1}))
+    assert save_crawler_report(engine, Eq, [report])["inserted"] == 1
+    with Session(engine) as session:
+        eq = session.exec(select(Eq).where(Eq.timestamp == report.timestamp)).one()
+        assert eq.id > len(example)
+
+
+def test_seed_dam_regions():
+    engine = get_in_memory_engine()
+    create_db_and_tables(engine)
+    # saved before `DamRegion` existed
+    with Session(engine) as session:
+        session.add(Dam(name="石門水庫", timestamp=1, storage=10, percent=0.5))
+        session.add(Dam(name="石門水庫", timestamp=2, storage=20, percent=0.5))
+        session.add(Dam(name="德基水庫", timestamp=1, storage=30, percent=0.25))
+        session.commit()
+
+    migrate(engine)
+    migrate(engine)
+
+    with Session(engine) as session:
+        regions = {r.name: r for r in session.exec(select(DamRegion))}
+        assert regions["竹"].dict() == dict(
+            name="竹", timestamp=2, storage=20, percent=0.5
+        )
+        assert regions["中"].percent == 0.25
+        assert regions["南"].storage == 0
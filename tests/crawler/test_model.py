@@ -0,0 +1,127 @@
+import json
+
+import pytest
+from sqlmodel import Session, select
+
+from crawler.intensity import SITES, intensity_matrix
+from crawler.model import (
+    Dam,
+    DamRegion,
+    DamReport,
+    Eq,
+    EqIntensity,
+    EqReport,
+    EqSite,
+    Power,
+    PowerArea,
+    PowerReport,
+    save_crawler_report,
+)
+from meter.domain import create_db_and_tables
+from tests.conftest import get_in_memory_engine
+
+
+class TestSaveCrawlerReportClass:
+    @pytest.fixture(autouse=True)
+    def setup_method(self) -> None:
+        self.engine = get_in_memory_engine()
+        create_db_and_tables(self.engine)
+
+    @pytest.mark.parametrize(
+        "model, report_model, table, rows",
+        [
+            (Dam, DamReport, Dam, 1),
+            (Eq, EqReport, Eq, 1),
+            # one row per region
+            (Power, PowerReport, PowerArea, 5),
+        ],
+    )
+    def test_save(self, model, report_model, table, rows):
+        example = json.load(open(f"crawler/example/{model.__name__.lower()}.json"))
+        report = [report_model(**r) for r in example]
+        n = len(report) * rows
+
+        result = save_crawler_report(self.engine, model, report)
+        assert result == {"inserted": n, "updated": 0, "skipped": 0}
+
+        result = save_crawler_report(self.engine, model, report)
+        assert result == {"inserted": 0, "updated": 0, "skipped": n}
+
+        with Session(self.engine) as session:
+            assert len(session.exec(select(table)).all()) == n
+
+    def test_save_update(self):
+        old = DamReport(name="石門水庫", timestamp=1, storage=1, percent=1)
+        new = DamReport(name="石門水庫", timestamp=1, storage=2, percent=2)
+        other = DamReport(name="石門水庫", timestamp=2, storage=3, percent=3)
+
+        save_crawler_report(self.engine, Dam, [old])
+        result = save_crawler_report(self.engine, Dam, [new, other], update=True)
+        assert result == {"inserted": 1, "updated": 1, "skipped": 0}
+
+        with Session(self.engine) as session:
+            dam = session.exec(select(Dam).where(Dam.timestamp == 1)).one()
+            assert dam.storage == 2
+
+    def test_save_duplicated_report(self):
+        report = [
+            DamReport(name="石門水庫", timestamp=1, storage=1, percent=1),
+            DamReport(name="石門水庫", timestamp=1, storage=2, percent=2),
+        ]
+
+        result = save_crawler_report(self.engine, Dam, report)
+        assert result == {"inserted": 1, "updated": 0, "skipped": 1}
+
+    def test_save_dam_regions(self):
+        save_crawler_report(
+            self.engine,
+            Dam,
+            [
+                DamReport(name="石門水庫", timestamp=1, storage=10, percent=10),
+                DamReport(name="石門水庫", timestamp=2, storage=20, percent=20),
+                DamReport(name="永和山水庫", timestamp=1, storage=30, percent=50),
+            ],
+        )
+
+        with Session(self.engine) as session:
+            region = session.get(DamRegion, "竹")
+            assert region.timestamp == 2
+            assert region.storage == 50
+            assert region.percent == pytest.approx(50 / (20 / 20 + 30 / 50))
+            assert session.get(DamRegion, "南").storage == 0
+
+    def test_save_eq_intensities(self):
+        site = EqSite(name="KAOHSIUNG", lon=120.3, lat=22.6, factor=1.5)
+        with Session(self.engine) as session:
+            session.add(site)
+            session.commit()
+            session.refresh(site)
+
+        base = dict(
+            geometry={"type": "Point", "coordinates": (120.5, 23.0)},
+            scale=6.0,
+            intensity=(1, 2, 3),
+            link="",
+            img="",
+        )
+        save_crawler_report(
+            self.engine,
+            Eq,
+            [
+                EqReport(timestamp=1, depth=10.0, **base),
+                # without depth, only the default sites are known
+                EqReport(timestamp=2, **base),
+            ],
+        )
+
+        sites = list(SITES.values()) + [(site.lon, site.lat, site.factor)]
+        (expected,) = intensity_matrix([6.0], [10.0], [120.5], [23.0], sites)
+        with Session(self.engine) as session:
+            intensities = {
+                (i.timestamp, i.site): i.intensity
+                for i in session.exec(select(EqIntensity))
+            }
+        assert intensities == {
+            **{(1, name): v for name, v in zip([*SITES, site.name], expected)},
+            **{(2, name): v for name, v in zip(SITES, base["intensity"])},
+        }
@@ -0,0 +1,91 @@
+import asyncio
+from collections import Counter
+
+import httpx
+
+from crawler.cache import MemoryCache, SQLCache
+from crawler.crawler.crawler import CrawlLimits
+from crawler.crawler.power import PowerCrawler
+from crawler.model import CrawlerCache
+from tests.conftest import get_in_memory_engine
+
+SUPPLY = {"records": [{}, {"fore_maxi_sply_capacity": "3000"}]}
+LOADS = "00:00,100,500,600,700\r\n00:10,110,510,610,710\r\n"
+
+
+def crawl(handler, cache, supply_ttl=3600):
+    power = PowerCrawler(
+        limits=CrawlLimits(backoff=0), cache=cache, supply_ttl=supply_ttl
+    )
+    power._client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def collect():
+        return [r async for batch in power.stream() for r in batch]
+
+    return asyncio.run(collect())
+
+
+def make_handler(requests: Counter, loads: str = LOADS):
+    loads_requested = asyncio.Event()
+
+    async def handler(request: httpx.Request):
+        name = request.url.path.split("/")[-1]
+        requests[name] += 1
+        if name == "loadareas.csv":
+            loads_requested.set()
+            return httpx.Response(200, text=loads)
+        # fails unless both are requested at once
+        await asyncio.wait_for(loads_requested.wait(), 1)
+        return httpx.Response(200, json=SUPPLY)
+
+    return handler
+
+
+def test_supply_fetched_with_loads():
+    requests = Counter()
+    reports = crawl(make_handler(requests), MemoryCache())
+
+    assert requests == {"loadpara.json": 1, "loadareas.csv": 1}
+    assert len(reports) == 2
+    assert reports[0].east["max_supply"] == 66.0
+    assert reports[0].north["load"] == 700
+
+
+def test_supply_cached_across_workers():
+    engine = get_in_memory_engine()
+    CrawlerCache.metadata.create_all(engine)
+    requests = Counter()
+
+    # each worker has its own crawler and cache client, sharing the database
+    for i in range(3):
+        loads = LOADS + f"00:{20 + i},120,520,620,720\r\n"
+        reports = crawl(make_handler(requests, loads), SQLCache(engine))
+        assert reports[1].south["max_supply"] == 960.0
+
+    assert requests == {"loadpara.json": 1, "loadareas.csv": 3}
+
+
+def test_supply_refetched_after_ttl():
+    cache = MemoryCache()
+    requests = Counter()
+    crawl(make_handler(requests), cache, supply_ttl=0)
+    crawl(make_handler(requests), cache, supply_ttl=0)
+
+    assert requests == {"loadpara.json": 2, "loadareas.csv": 2}
+
+
+def test_unchanged_loads_skipped():
+    cache = MemoryCache()
+    requests = Counter()
+
+    assert len(crawl(make_handler(requests), cache)) == 2
+    assert crawl(make_handler(requests), cache) == []
+    assert requests["loadareas.csv"] == 2
+
+
+def test_without_cache():
+    requests = Counter()
+
+    assert len(crawl(make_handler(requests), None)) == 2
+    assert len(crawl(make_handler(requests), None)) == 2
+    assert requests == {"loadpara.json": 2, "loadareas.csv": 2}
@@ -7,7 +7,7 @@ from meter.constant.rule_operator import RuleOperator
 from meter.constant.rule_position import RulePosition
 from meter.constant.rule_resource import RuleResource
 from meter.constant.template_path import TemplatePath
-from meter.domain.issue import Issue, IssueService, UpdateIssue
+from meter.domain.issue import Issue, IssueService, UpdateIssue, get_digest
 from meter.domain.rule import Rule
 from meter.domain.user import User
 from meter.helper import get_formatted_string_from_template
@@ -28,6 +28,9 @@ class MockSession:
     def add(self, arg1):
         pass
 
+    def bulk_save_objects(self, arg1):
+        pass
+
     def commit(self):
         pass
 
@@ -72,6 +75,30 @@ class TestIssueDomainClass:
             and issue.status.value == IssueStatus.CREATED.value
         )
 
+    def test_create_many(self):
+        rules = [
+            Rule(
+                id=i,
+                user_id=1,
+                name=f"foo{i}",
+                position=RulePosition.AGONGDIAN_RESERVOIR,
+                resource=RuleResource.PERCENT,
+                operator=RuleOperator.EQUAL_TO,
+                value=12,
+            )
+            for i in (1, 2)
+        ]
+        issues = self.service.create_many(rules)
+
+        assert [i.rule_id for i in issues] == [1, 2]
+        title, content = get_digest(issues)
+        assert title == get_formatted_string_from_template(
+            TemplatePath.DIGEST_TITLE.value,
+            count=2,
+        )
+        assert issues[1].title in content
+        assert get_digest(issues[:1]) == (issues[0].title, issues[0].content)
+
     def test_create_failed(self, monkeypatch):
         def mock_commit(arg1):
             raise Exception()
@@ -0,0 +1,133 @@
+import socketserver
+import threading
+from queue import Full
+
+import pytest
+
+from meter.domain import SMTPServerParam
+from meter.domain.smtp import EmailService, SMTPPool, close_pools
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough of SMTP for `smtplib`, recording what is sent."""
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        stub: SMTPStub = self.server.stub
+        stub.connections += 1
+        self.reply("220 stub")
+        while line := self.rfile.readline().decode().strip():
+            command = line.split(" ")[0].upper()
+            if command == "EHLO":
+                self.reply("250-stub")
+                self.reply("250 AUTH PLAIN")
+            elif command == "AUTH":
+                stub.logins += 1
+                self.reply("235 ok")
+            elif command == "DATA":
+                self.reply("354 go on")
+                data = b"".join(iter(self.rfile.readline, b".\r\n"))
+                if stub.rejects > 0:
+                    stub.rejects -= 1
+                    self.reply("451 try again")
+                else:
+                    stub.messages.append(data)
+                    self.reply("250 ok")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.stub = self
+        self.connections = 0
+        self.logins = 0
+        self.rejects = 0
+        self.messages = []
+
+
+@pytest.fixture
+def smtp_stub():
+    server = SMTPStub()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get_config(stub: SMTPStub, **kwargs):
+    return SMTPServerParam(
+        server="127.0.0.1",
+        port=stub.server_address[1],
+        noreply="noreply@example.com",
+        noreply_password="secret",
+        backoff=0,
+        **kwargs,
+    )
+
+
+def test_send_many_on_persistent_connections(smtp_stub: SMTPStub):
+    email_svc = EmailService(get_config(smtp_stub, workers=2))
+    for i in range(50):
+        email_svc.send_noreply([f"user{i}@example.com"], "Hi", "content")
+    close_pools()
+
+    assert len(smtp_stub.messages) == 50
+    assert smtp_stub.connections <= 2
+    assert smtp_stub.logins == smtp_stub.connections
+
+
+def test_renew_connection(smtp_stub: SMTPStub):
+    pool = SMTPPool(get_config(smtp_stub, workers=1, max_messages=4), "a@b.c", None)
+    for _ in range(10):
+        pool.submit(EmailService.message("a@b.c", ["d@e.f"], "Hi", "text", "html"))
+    pool.close()
+
+    assert smtp_stub.connections == 3
+    assert smtp_stub.logins == 0
+    assert pool.metrics().sent == 10
+
+
+def test_retry(smtp_stub: SMTPStub):
+    smtp_stub.rejects = 2
+    pool = SMTPPool(get_config(smtp_stub, workers=1, retries=1), "a@b.c", None)
+    msg = EmailService.message("a@b.c", ["d@e.f"], "Hi", "text", "html")
+    pool.submit(msg)
+    pool.submit(msg)
+    pool.close()
+
+    # the first gives up after one retry, the second is sent at once
+    assert pool.metrics() == {
+        "queued": 0,
+        "sending": 0,
+        "sent": 1,
+        "retried": 1,
+        "failed": 1,
+        "connections": 0,
+    }
+    assert len(smtp_stub.messages) == 1
+    assert smtp_stub.connections == 1
+
+
+def test_backpressure(smtp_stub: SMTPStub):
+    config = get_config(smtp_stub, workers=0, queue_size=2, queue_timeout=0.01)
+    pool = SMTPPool(config, "a@b.c", None)
+    msg = EmailService.message("a@b.c", ["d@e.f"], "Hi", "text", "html")
+    pool.submit(msg)
+    pool.submit(msg)
+
+    assert pool.metrics().queued == 2
+    with pytest.raises(Full):
+        pool.submit(msg)
+    # callers on an event loop do not wait
+    with pytest.raises(Full):
+        pool.submit(msg, block=False)
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+from sqlmodel import Session
+
+from meter.domain.user import PasswordHasher, UserLogin, UserService, UserSignup
+
+
+class TestUserDomainClass:
+    def signup(self, session: Session, hasher: PasswordHasher):
+        UserService(session, hasher).signup(
+            UserSignup(name="foo", email="foo@foo.com", password="foo")
+        )
+
+    def test_login(self, test_session: Session):
+        service = UserService(test_session, PasswordHasher(rounds=4))
+        self.signup(test_session, service.hasher)
+
+        assert service.login(UserLogin(name="foo", password="foo")).name == "foo"
+        assert service.login(UserLogin(name="FOO@foo.com", password="foo")) is not None
+        assert service.login(UserLogin(name="foo", password="bar")) is None
+
+    def test_login_rehash(self, test_session: Session):
+        self.signup(test_session, PasswordHasher(rounds=4))
+        service = UserService(test_session, PasswordHasher(rounds=5))
+
+        assert service.login(UserLogin(name="foo", password="bar")) is None
+        user = service.login(UserLogin(name="foo", password="foo"))
+        assert user.password_digest.startswith("$2b$05$")
+        # not weaker than the cost, kept as it is
+        digest = user.password_digest
+        service.login(UserLogin(name="foo", password="foo"))
+        assert user.password_digest == digest
+
+    def test_hash_off_the_event_loop(self):
+        hasher = PasswordHasher(rounds=4)
+
+        async def hash():
+            return await hasher.run(
+                lambda: (threading.current_thread(), hasher.hash("foo"))
+            )
+
+        thread, digest = asyncio.run(hash())
+        assert thread is not threading.current_thread()
+        assert hasher.verify_and_update("foo", digest) == (True, None)
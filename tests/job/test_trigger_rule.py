@@ -0,0 +1,308 @@
+import json
+from queue import Full
+
+import pytest
+from sqlmodel import Session, select
+
+from crawler.model import (
+    Dam,
+    DamReport,
+    Eq,
+    EqReport,
+    Power,
+    PowerReport,
+    save_crawler_report,
+)
+from meter.constant.rule_operator import RuleOperator
+from meter.constant.rule_position import RulePosition
+from meter.constant.rule_resource import RuleResource
+from meter.domain.issue import Issue, IssueService
+from meter.domain.rule import Rule, RuleCursor
+from meter.domain.user import User
+from meter.job.rule_index import RuleIndex
+from meter.job.trigger_rule import TriggerRuleJob
+
+
+class MockEmailService:
+    def __init__(self, full: int = 0) -> None:
+        self.sent = []
+        # sends which fail as if the queue was full
+        self.full = full
+
+    def send_noreply(self, to_addrs, subject, text, html=None, block=True):
+        assert not block
+        if self.full > 0:
+            self.full -= 1
+            raise Full
+        self.sent.append((to_addrs, subject))
+
+
+def make_rule(id, position, resource, operator, value):
+    return Rule(
+        id=id,
+        user_id=1,
+        name=f"rule{id}",
+        position=position,
+        resource=resource,
+        operator=operator,
+        value=value,
+        is_enable=True,
+    )
+
+
+class TestRuleIndexClass:
+    @pytest.mark.parametrize(
+        "operator, expected",
+        [
+            (RuleOperator.EQUAL_TO, [2]),
+            (RuleOperator.GREATER_THAN, [1]),
+            (RuleOperator.GREATER_THAN_OR_EQUAL_TO, [1, 2]),
+            (RuleOperator.LESS_THAN, [3]),
+            (RuleOperator.LESS_THAN_OR_EQUAL_TO, [2, 3]),
+        ],
+    )
+    def test_match(self, operator, expected):
+        rules = [
+            make_rule(i, RulePosition.DEJI_RESERVOIR, RuleResource.PERCENT, operator, v)
+            for i, v in ((3, 70), (1, 30), (2, 50))
+        ]
+        index = RuleIndex(rules)
+
+        matched = index.match(RulePosition.DEJI_RESERVOIR, {RuleResource.PERCENT: 50})
+        assert sorted(r.id for r in matched) == expected
+
+    @pytest.mark.parametrize(
+        "operators, expected",
+        [
+            ((RuleOperator.GREATER_THAN, RuleOperator.EQUAL_TO), 3),
+            ((RuleOperator.GREATER_THAN, RuleOperator.LESS_THAN), None),
+        ],
+    )
+    def test_lower_bound(self, operators, expected):
+        index = RuleIndex(
+            [
+                make_rule(
+                    i, RulePosition.HSINCHU_EARTHQUAKE, RuleResource.INTENSITY, o, v
+                )
+                for i, (o, v) in enumerate(zip(operators, (5, 3)))
+            ]
+        )
+
+        bound = index.lower_bound(
+            RulePosition.HSINCHU_EARTHQUAKE, RuleResource.INTENSITY
+        )
+        assert bound == expected
+
+    def test_match_other_resource(self):
+        index = RuleIndex(
+            [
+                make_rule(
+                    1,
+                    RulePosition.DEJI_RESERVOIR,
+                    RuleResource.STORAGE,
+                    RuleOperator.LESS_THAN,
+                    100,
+                )
+            ]
+        )
+
+        assert index.match(RulePosition.DEJI_RESERVOIR, {RuleResource.PERCENT: 1}) == []
+        assert index.match(RulePosition.SHIMEN_RESERVOIR, {}) == []
+
+
+class TestTriggerRuleJobClass:
+    @pytest.fixture(autouse=True)
+    def setup_method(self, test_session: Session) -> None:
+        self.session = test_session
+        self.session.add(
+            User(
+                id=1,
+                name="foo",
+                email="foo@foo.com",
+                password_digest="somefakedigest",
+            )
+        )
+        self.session.commit()
+        for c, report_model in ((Power, PowerReport), (Eq, EqReport), (Dam, DamReport)):
+            report = json.load(open(f"crawler/example/{c.__name__.lower()}.json"))
+            save_crawler_report(
+                self.session.get_bind(), c, [report_model(**r) for r in report]
+            )
+
+        self.email_svc = MockEmailService()
+        self.job = TriggerRuleJob(
+            self.session,
+            self.email_svc,
+            IssueService(self.session),
+        )
+
+    def add_rules(self, *rules):
+        for rule in rules:
+            self.session.add(rule)
+        self.session.commit()
+
+    def get_issue_rule_ids(self):
+        return sorted(i.rule_id for i in self.session.exec(select(Issue)).all())
+
+    def test_trigger_reservoir(self):
+        # latest 石門水庫 percent is 36.88
+        self.add_rules(
+            make_rule(
+                1,
+                RulePosition.SHIMEN_RESERVOIR,
+                RuleResource.PERCENT,
+                RuleOperator.LESS_THAN,
+                40,
+            ),
+            make_rule(
+                2,
+                RulePosition.SHIMEN_RESERVOIR,
+                RuleResource.PERCENT,
+                RuleOperator.LESS_THAN,
+                30,
+            ),
+            make_rule(
+                3,
+                RulePosition.SHIMEN_RESERVOIR,
+                RuleResource.PERCENT,
+                RuleOperator.GREATER_THAN,
+                30,
+            ),
+        )
+
+        self.job.trigger_over_threshold()
+
+        assert self.get_issue_rule_ids() == [1, 3]
+        # one digest for both
+        assert self.email_svc.sent == [
+            (["foo@foo.com"], "[bot] 2 alerts triggered by your rules")
+        ]
+
+    def test_trigger_same_data_once(self):
+        self.add_rules(
+            make_rule(
+                1,
+                RulePosition.SHIMEN_RESERVOIR,
+                RuleResource.PERCENT,
+                RuleOperator.LESS_THAN,
+                40,
+            ),
+        )
+
+        self.job.trigger_over_threshold()
+        self.job.trigger_over_threshold()
+
+        assert self.get_issue_rule_ids() == [1]
+        assert self.email_svc.sent == [
+            (["foo@foo.com"], '[bot] Alert triggered by rule "rule1"')
+        ]
+
+    def test_trigger_with_full_email_queue(self):
+        self.session.add(
+            User(id=2, name="bar", email="bar@bar.com", password_digest="fake")
+        )
+        for id, user_id in ((1, 1), (2, 2)):
+            rule = make_rule(
+                id,
+                RulePosition.SHIMEN_RESERVOIR,
+                RuleResource.PERCENT,
+                RuleOperator.LESS_THAN,
+                40,
+            )
+            rule.user_id = user_id
+            self.session.add(rule)
+        self.session.commit()
+        self.job.email_svc = MockEmailService(full=1)
+
+        self.job.trigger_over_threshold()
+
+        # the issues are saved, and only the first digest is lost
+        assert self.get_issue_rule_ids() == [1, 2]
+        assert len(self.job.email_svc.sent) == 1
+
+    def test_trigger_electricity(self):
+        latest = max(
+            json.load(open("crawler/example/power.json")),
+            key=lambda p: p["timestamp"],
+        )
+        self.add_rules(
+            make_rule(
+                1,
+                RulePosition.NORTH_ELECTRICITY,
+                RuleResource.LOAD,
+                RuleOperator.GREATER_THAN_OR_EQUAL_TO,
+                latest["north"]["load"],
+            ),
+            make_rule(
+                2,
+                RulePosition.EAST_ELECTRICITY,
+                RuleResource.RECV_RATE,
+                RuleOperator.GREATER_THAN,
+                latest["east"]["recv_rate"],
+            ),
+        )
+
+        self.job.trigger_over_threshold()
+
+        assert self.get_issue_rule_ids() == [1]
+
+    def test_trigger_disabled_rule(self):
+        rule = make_rule(
+            1,
+            RulePosition.SHIMEN_RESERVOIR,
+            RuleResource.PERCENT,
+            RuleOperator.LESS_THAN,
+            40,
+        )
+        rule.is_enable = False
+        self.add_rules(rule)
+
+        self.job.trigger_over_threshold()
+
+        assert self.get_issue_rule_ids() == []
+
+    def add_earthquake(self, timestamp, intensity):
+        report = EqReport(
+            timestamp=timestamp,
+            geometry={"type": "Point", "coordinates": (121.0, 24.0)},
+            scale=5.0,
+            intensity=intensity,
+            link="",
+            img="",
+        )
+        save_crawler_report(self.session.get_bind(), Eq, [report])
+
+    def test_trigger_earthquake(self):
+        # the latest earthquake has intensity (0, 0, 0)
+        self.add_rules(
+            make_rule(
+                1,
+                RulePosition.HSINCHU_EARTHQUAKE,
+                RuleResource.INTENSITY,
+                RuleOperator.GREATER_THAN_OR_EQUAL_TO,
+                1,
+            ),
+            make_rule(
+                2,
+                RulePosition.TAINAN_EARTHQUAKE,
+                RuleResource.INTENSITY,
+                RuleOperator.GREATER_THAN_OR_EQUAL_TO,
+                1,
+            ),
+        )
+        self.job.trigger_over_threshold()
+        assert self.get_issue_rule_ids() == []
+
+        # both are newer than the cursor, only the newest match of a rule counts
+        self.add_earthquake(1690000000, (3, 0, 0))
+        self.add_earthquake(1690000100, (2, 0, 2))
+        self.job.trigger_over_threshold()
+        assert self.get_issue_rule_ids() == [1, 2]
+        assert (
+            self.session.get(RuleCursor, RulePosition.HSINCHU_EARTHQUAKE).timestamp
+            == 1690000100
+        )
+
+        # nothing new
+        self.job.trigger_over_threshold()
+        assert self.get_issue_rule_ids() == [1, 2]
@@ -0,0 +1,64 @@
+import sys
+from types import ModuleType
+
+import pytest
+from celery.signals import worker_process_init, worker_process_shutdown
+from sqlalchemy import text
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # `celeryconfig.py` and `dbconfig.py` are deployment files
+    dbconfig = ModuleType("telery.dbconfig")
+    dbconfig.db_url = f"sqlite:///{tmp_path / 'telery.db'}"
+    monkeypatch.setitem(sys.modules, "telery.celeryconfig", ModuleType("celeryconfig"))
+    monkeypatch.setitem(sys.modules, "telery.dbconfig", dbconfig)
+
+    from telery import db
+
+    yield db
+    db.dispose_engine()
+    worker_process_init.disconnect(db.on_worker_process_init)
+    worker_process_shutdown.disconnect(db.on_worker_process_shutdown)
+    for name in ("telery.db", "telery"):
+        sys.modules.pop(name, None)
+
+
+def test_engine_per_worker_process(db):
+    worker_process_init.send(sender=None)
+    engine = db.get_engine()
+    with db.get_session() as session:
+        assert session.execute(text("SELECT 1")).scalar() == 1
+    with db.get_session() as session:
+        assert session.get_bind() is engine
+    assert db.get_engine() is engine
+
+    pool = engine.pool
+    worker_process_shutdown.send(sender=None)
+    # disposed, a new pool replaces the closed one
+    assert engine.pool is not pool
+    assert db._engine is None
+
+
+def test_engine_without_worker_process_init(db):
+    engine = db.get_engine()
+
+    assert db.get_engine() is engine
+    # a later `worker_process_init` replaces it
+    pool = engine.pool
+    worker_process_init.send(sender=None)
+    assert db.get_engine() is not engine
+    assert engine.pool is not pool
+
+
+def test_engine_args(db, monkeypatch):
+    assert db._engine_args() == {}
+
+    monkeypatch.setattr(db.dbconfig, "db_url", "postgresql://localhost/testdb")
+    monkeypatch.setattr(db.dbconfig, "pool_size", 3, raising=False)
+    assert db._engine_args() == {
+        "pool_size": 3,
+        "max_overflow": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    }
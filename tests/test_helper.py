@@ -1,3 +1,5 @@
+import os
+
 import pytest
 from fastapi import HTTPException, status
 
@@ -26,3 +28,28 @@ class TestHelperClass:
 
         message = get_message_by_response_code(ResponseCode.RULE_CREATE_FAILED_1001)
         assert message == ResponseCode.RULE_CREATE_FAILED_1001.name.__str__()
+
+    def test_template_registry_cached(self, tmp_path, monkeypatch):
+        path = tmp_path / "hi.template"
+        path.write_text("Hi {name}")
+        templates = TemplateRegistry(check_interval=60)
+
+        assert templates.render(str(path), name="foo") == "Hi foo"
+        # not read again within `check_interval`
+        monkeypatch.setattr("builtins.open", None)
+        monkeypatch.setattr("os.stat", None)
+        assert templates.render_many(str(path), [{"name": "a"}, {"name": "b"}]) == [
+            "Hi a",
+            "Hi b",
+        ]
+
+    def test_template_registry_reloaded(self, tmp_path):
+        path = tmp_path / "hi.template"
+        path.write_text("Hi {name}")
+        templates = TemplateRegistry(check_interval=0)
+        assert templates.render(str(path), name="foo") == "Hi foo"
+
+        path.write_text("Bye {{name}}")
+        os.utime(path, ns=(0, 0))
+
+        assert templates.render(str(path), name="foo") == "Bye {name}"